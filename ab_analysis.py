@@ -0,0 +1,421 @@
+"""
+Hook A/B Test Analysis
+Streams events into per-variant counters and compares the variants:
+
+- visits, distinct visitors and distinct registrants per hook variant
+  (the same definitions as the dashboard's ab_test summary: registrants are
+  deduplicated by email, visitors by visitor id falling back to session id)
+- a two-proportion z-test of each variant's conversion rate against the
+  control, with a 95% interval for the difference
+- Beta posteriors (uniform prior) and the probability that each variant
+  has the best conversion rate
+
+Events arrive in chunks - from a server-side cursor (see
+database_unified.stream_ab_test_chunks) or from backup files - and only the
+counters are kept, so a test can be updated as new events come in and the
+statistics recomputed from the running counts. Visitor keys are 64-bit
+hashes; with NumPy installed each chunk is counted with vectorized
+operations and distinct keys are kept as sorted int64 arrays, otherwise
+plain Python sets are used.
+"""
+
+import glob
+import hashlib
+import json
+import math
+import random
+
+try:
+    import numpy as np
+except ImportError:  # optional - the pure Python path gives the same results
+    np = None
+
+VISIT = 'visit'
+REGISTRATION = 'registration'
+
+DEFAULT_CHUNK_SIZE = 50000
+POSTERIOR_DRAWS = 20000
+SIGNIFICANCE_LEVEL = 0.05
+WINNER_PROBABILITY = 0.95
+
+
+def stable_hash(value):
+    """Signed 64-bit hash of a string, stable across processes"""
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def _sorted_unique(keys):
+    """Sorted distinct values of an int64 array (sort + neighbour compare;
+    much faster than np.unique's hash table for 64-bit hashes)"""
+    keys = np.sort(keys)
+    if len(keys) < 2:
+        return keys
+    keep = np.empty(len(keys), dtype=bool)
+    keep[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+    return keys[keep]
+
+
+class _DistinctKeys:
+    """Set of int64 keys: sorted NumPy array plus not-yet-merged chunks"""
+
+    def __init__(self):
+        if np is not None:
+            self._keys = np.empty(0, dtype=np.int64)
+            self._pending = []
+            self._pending_size = 0
+        else:
+            self._keys = set()
+
+    def update(self, keys):
+        if np is None:
+            self._keys.update(keys)
+            return
+        keys = _sorted_unique(keys)
+        self._pending.append(keys)
+        self._pending_size += len(keys)
+        # Merge once the pending chunks outgrow the merged set, so the
+        # sorting work stays proportional to the number of keys added
+        if self._pending_size > max(len(self._keys), DEFAULT_CHUNK_SIZE):
+            self._compact()
+
+    def _compact(self):
+        if self._pending:
+            self._keys = _sorted_unique(np.concatenate([self._keys] + self._pending))
+            self._pending = []
+            self._pending_size = 0
+
+    def __len__(self):
+        if np is not None:
+            self._compact()
+        return len(self._keys)
+
+
+class _VariantCounts:
+    def __init__(self):
+        self.visits = 0
+        self.registration_rows = 0
+        self.visitors = _DistinctKeys()
+        self.registrants = _DistinctKeys()
+
+
+class HookABTest:
+    """Running A/B comparison of hook variants
+
+    Args:
+        control: variant the others are compared against (default: the
+            first variant in alphabetical order, normally 'A')
+        seed: seed for the posterior draws, so equal counts always give
+            equal results
+    """
+
+    def __init__(self, control=None, seed=0):
+        self.control = control
+        self.seed = seed
+        self.watermarks = {}
+        self.events_processed = 0
+        self._variants = {}
+
+    def add_chunk(self, kind, variants, keys):
+        """Count one chunk of events of a single kind (VISIT or REGISTRATION)
+
+        Args:
+            variants: hook variant of each event
+            keys: 64-bit visitor key (visits) or registrant key (registrations)
+                of each event, same length as `variants`
+        """
+        if kind not in (VISIT, REGISTRATION):
+            raise ValueError(f"Unknown event kind: {kind}")
+        if len(variants) != len(keys):
+            raise ValueError("variants and keys must have the same length")
+        if not len(variants):
+            return
+        self.events_processed += len(variants)
+
+        if np is not None:
+            names, codes = np.unique(np.asarray(variants, dtype=object), return_inverse=True)
+            self._add_coded(kind, list(names), codes, np.asarray(keys, dtype=np.int64))
+        else:
+            grouped = {}
+            for variant, key in zip(variants, keys):
+                grouped.setdefault(variant, []).append(key)
+            for name, group in grouped.items():
+                self._count(kind, name, len(group), group)
+
+    def add_coded_chunk(self, kind, names, codes, keys):
+        """Like add_chunk, with variants given as indexes into `names`
+
+        The fast path for database chunks: every column is an integer, so
+        with NumPy the chunk never becomes Python objects.
+        """
+        if kind not in (VISIT, REGISTRATION):
+            raise ValueError(f"Unknown event kind: {kind}")
+        if len(codes) != len(keys):
+            raise ValueError("codes and keys must have the same length")
+        if not len(codes):
+            return
+        self.events_processed += len(codes)
+
+        if np is not None:
+            self._add_coded(kind, names, np.asarray(codes, dtype=np.intp), np.asarray(keys, dtype=np.int64))
+        else:
+            grouped = {}
+            for code, key in zip(codes, keys):
+                grouped.setdefault(code, []).append(key)
+            for code, group in grouped.items():
+                self._count(kind, names[code], len(group), group)
+
+    def _add_coded(self, kind, names, codes, keys):
+        """Split a chunk by variant with one sort, then count each slice"""
+        order = np.argsort(codes, kind='stable')
+        sizes = np.bincount(codes, minlength=len(names))
+        groups = np.split(keys[order], np.cumsum(sizes)[:-1])
+        for name, size, group in zip(names, sizes, groups):
+            if size:
+                self._count(kind, name, int(size), group)
+
+    def _count(self, kind, variant, size, keys):
+        counts = self._variants.get(variant)
+        if counts is None:
+            counts = self._variants[variant] = _VariantCounts()
+        if kind == VISIT:
+            counts.visits += size
+            counts.visitors.update(keys)
+        else:
+            counts.registration_rows += size
+            counts.registrants.update(keys)
+
+    def consume(self, chunks):
+        """Add (table, kind, variant_names, rows) chunks read from the database
+
+        Rows are (variant index, key hash, id) integer tuples; each table's
+        watermark advances to the highest id seen.
+        """
+        for table, kind, names, rows in chunks:
+            if not rows:
+                continue
+            if np is not None:
+                chunk = np.array(rows, dtype=np.int64)
+                codes, keys, max_id = chunk[:, 0], chunk[:, 1], int(chunk[:, 2].max())
+            else:
+                codes, keys, ids = zip(*rows)
+                max_id = max(ids)
+            self.add_coded_chunk(kind, names, codes, keys)
+            self.watermarks[table] = max(self.watermarks.get(table, 0), max_id)
+        return self
+
+    def add_records(self, records, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Add backup-file records (analytics events or registrations, camelCase or snake_case)"""
+        buffers = {VISIT: ([], []), REGISTRATION: ([], [])}
+        for record in records:
+            for kind, variant, key in _normalize_record(record):
+                variants, keys = buffers[kind]
+                variants.append(variant)
+                keys.append(stable_hash(key))
+                if len(variants) >= chunk_size:
+                    self.add_chunk(kind, variants, keys)
+                    buffers[kind] = ([], [])
+        for kind, (variants, keys) in buffers.items():
+            self.add_chunk(kind, variants, keys)
+        return self
+
+    def totals(self):
+        """Raw row counts (used to notice deleted events)"""
+        return {
+            'visits': sum(c.visits for c in self._variants.values()),
+            'registrations': sum(c.registration_rows for c in self._variants.values()),
+        }
+
+    def results(self, alpha=SIGNIFICANCE_LEVEL, draws=POSTERIOR_DRAWS):
+        """Per-variant counts, z-tests against the control and posterior probabilities"""
+        variants = {}
+        for name in sorted(self._variants):
+            counts = self._variants[name]
+            visitors = len(counts.visitors)
+            registrations = len(counts.registrants)
+            variants[name] = {
+                'visits': counts.visits,
+                'visitors': visitors,
+                'registrations': registrations,
+                'conversion_rate': registrations / visitors if visitors else 0.0,
+            }
+
+        control = self.control if self.control in variants else next(iter(variants), None)
+        comparisons = {}
+        prob_best = {}
+        if control is not None:
+            trials = {name: _trial(v) for name, v in variants.items()}
+            samples = _posterior_samples(trials, draws, self.seed)
+            prob_best = _prob_best(samples)
+            for name in variants:
+                if name == control:
+                    continue
+                comparison = two_proportion_z_test(*trials[control], *trials[name])
+                comparison['significant'] = comparison['p_value'] < alpha
+                comparison['prob_beats_control'] = _prob_greater(samples[name], samples[control])
+                comparisons[name] = comparison
+
+        winner = None
+        if prob_best:
+            leader = max(prob_best, key=prob_best.get)
+            if prob_best[leader] >= WINNER_PROBABILITY:
+                winner = leader
+
+        return {
+            'control': control,
+            'variants': variants,
+            'comparisons': comparisons,
+            'prob_best': prob_best,
+            'winner': winner,
+            'events_processed': self.events_processed,
+            'engine': 'numpy' if np is not None else 'python',
+        }
+
+
+def _trial(variant):
+    """(successes, trials) - registrants can't exceed visitors for the tests"""
+    return min(variant['registrations'], variant['visitors']), variant['visitors']
+
+
+def two_proportion_z_test(control_successes, control_trials, successes, trials):
+    """Compare a variant's rate with the control's
+
+    Returns the rate difference (variant - control), its 95% interval
+    (unpooled standard error), the z statistic (pooled) and the two-sided
+    p-value.
+    """
+    if not control_trials or not trials:
+        return {'difference': 0.0, 'ci_95': [0.0, 0.0], 'z': 0.0, 'p_value': 1.0}
+
+    p1 = control_successes / control_trials
+    p2 = successes / trials
+    difference = p2 - p1
+
+    pooled = (control_successes + successes) / (control_trials + trials)
+    pooled_se = math.sqrt(pooled * (1 - pooled) * (1 / control_trials + 1 / trials))
+    z = difference / pooled_se if pooled_se else 0.0
+    p_value = math.erfc(abs(z) / math.sqrt(2))
+
+    se = math.sqrt(p1 * (1 - p1) / control_trials + p2 * (1 - p2) / trials)
+    return {
+        'difference': difference,
+        'ci_95': [difference - 1.96 * se, difference + 1.96 * se],
+        'z': z,
+        'p_value': p_value,
+    }
+
+
+def _posterior_samples(trials, draws, seed):
+    """Draws from each variant's Beta(1 + successes, 1 + failures) posterior"""
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        return {name: rng.beta(1 + s, 1 + n - s, size=draws) for name, (s, n) in trials.items()}
+    rng = random.Random(seed)
+    draws = min(draws, 4000)
+    return {name: [rng.betavariate(1 + s, 1 + n - s) for _ in range(draws)] for name, (s, n) in trials.items()}
+
+
+def _prob_best(samples):
+    names = list(samples)
+    if np is not None:
+        best = np.argmax(np.vstack([samples[name] for name in names]), axis=0)
+        counts = np.bincount(best, minlength=len(names))
+        return {name: float(count) / len(best) for name, count in zip(names, counts)}
+    wins = dict.fromkeys(names, 0)
+    for values in zip(*(samples[name] for name in names)):
+        wins[names[max(range(len(names)), key=values.__getitem__)]] += 1
+    total = len(samples[names[0]])
+    return {name: count / total for name, count in wins.items()}
+
+
+def _prob_greater(a, b):
+    if np is not None:
+        return float(np.mean(a > b))
+    return sum(x > y for x, y in zip(a, b)) / len(a)
+
+
+def _normalize_record(record):
+    """(kind, variant, key) tuples for one backup-file record
+
+    Registrations backups have no `event`; analytics events carrying an
+    email are counted as registrations as well, like the original
+    visits-*.json exports recorded them.
+    """
+    variant = record.get('hook_variant') or record.get('hookVariant')
+    if not variant:
+        return []
+    visitor = (record.get('visitor_id') or record.get('visitorId')
+               or record.get('session_id') or record.get('sessionId'))
+    email = record.get('email')
+    event = record.get('event')
+
+    rows = []
+    if event is None or event == 'registration':
+        if email or visitor:
+            rows.append((REGISTRATION, variant, email or visitor))
+        return rows
+    if event == 'page_visit':
+        if visitor:
+            rows.append((VISIT, variant, visitor))
+        if email:
+            rows.append((REGISTRATION, variant, email))
+    return rows
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array from a file, one at a time
+
+    Reads chunk_size characters at a time, so memory stays at one chunk
+    plus the element being decoded whatever the size of the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof, opened = '', 0, False, False
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError('unterminated JSON array' if opened else 'expected a JSON array')
+            buffer, pos = f.read(chunk_size), 0
+            eof = not buffer
+            continue
+        if not opened:
+            if buffer[pos] != '[':
+                raise ValueError('expected a JSON array')
+            opened = True
+            pos += 1
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            complete = end < len(buffer) or eof
+        except ValueError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            # Element runs past this chunk - append the next one and retry
+            more = f.read(chunk_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        yield item
+        pos = end
+
+
+def iter_backup_records(patterns):
+    """Yield records from JSON array files (visits-*.json, *_latest.json) and JSONL segments
+
+    Both formats are streamed record by record; neither is loaded whole.
+    """
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path) as f:
+                if path.endswith('.jsonl'):
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+                else:
+                    yield from iter_json_array(f)
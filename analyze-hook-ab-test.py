@@ -1,160 +1,81 @@
 #!/usr/bin/env python3
 """
 Analyze A/B Test Results for Hook Variants
-Calculates conversion rate (registration rate) by hook variant (A vs B)
+Compares the registration rate of each hook variant against the control
+(two-proportion z-test and Bayesian probability to be best). Events are
+streamed, so millions of them fit in memory; see ab_analysis.py.
+
+Usage:
+    python3 analyze-hook-ab-test.py                  # analytics/visits-*.json
+    python3 analyze-hook-ab-test.py FILE_OR_GLOB ... # backup files (.json / .jsonl)
+    python3 analyze-hook-ab-test.py --db             # the live database (STORAGE_BACKEND)
 """
 
-import json
-import os
+import sys
+import time
 from datetime import datetime
-from collections import defaultdict
 
-def analyze_hook_ab_test():
-    """Analyze registration rates by hook variant"""
-    
-    analytics_dir = 'analytics'
-    
-    # Collect all data
-    all_data = []
-    
-    if os.path.exists(analytics_dir):
-        for filename in os.listdir(analytics_dir):
-            if filename.startswith('visits-') and filename.endswith('.json'):
-                filepath = os.path.join(analytics_dir, filename)
-                try:
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                        all_data.extend(data)
-                except Exception as e:
-                    print(f"Error reading {filepath}: {e}")
-    
-    # Organize data by hook variant
-    variant_stats = defaultdict(lambda: {
-        'total_visits': 0,
-        'registrations': 0,
-        'unique_visitors': set(),
-        'unique_registrants': set(),
-        'visitor_names': [],
-        'page_views': defaultdict(int)
-    })
-    
-    # Process all events
-    for event in all_data:
-        hook_variant = event.get('hookVariant', 'Unknown')
-        visitor_id = event.get('visitorId')
-        session_id = event.get('sessionId')
-        event_type = event.get('event', 'page_visit')
-        page = event.get('page', 'unknown')
-        name = event.get('name')
-        email = event.get('email')
-        
-        # Track by variant
-        if hook_variant in ['A', 'B']:
-            stats = variant_stats[hook_variant]
-            
-            # Count page visits
-            if event_type == 'page_visit':
-                stats['total_visits'] += 1
-                if visitor_id:
-                    stats['unique_visitors'].add(visitor_id)
-                stats['page_views'][page] += 1
-            
-            # Count registrations
-            if event_type == 'registration' or (event_type == 'page_visit' and email):
-                stats['registrations'] += 1
-                if visitor_id:
-                    stats['unique_registrants'].add(visitor_id)
-                if name:
-                    stats['visitor_names'].append(name)
-    
-    # Calculate conversion rates
+from ab_analysis import HookABTest, iter_backup_records
+
+DEFAULT_FILES = ['analytics/visits-*.json']
+
+def run_analysis(args):
+    test = HookABTest()
+    if '--db' in args:
+        from storage import get_storage
+        database = get_storage()
+        return test.consume(database.stream_ab_test_chunks()), f'database ({database.name})'
+    patterns = [arg for arg in args if not arg.startswith('--')] or DEFAULT_FILES
+    return test.add_records(iter_backup_records(patterns)), ', '.join(patterns)
+
+def print_report(results, source, elapsed):
     print("\n" + "="*70)
     print("HOOK VARIANT A/B TEST ANALYSIS")
     print("="*70)
-    print(f"Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-    
-    if not variant_stats:
+    print(f"Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Source: {source}")
+    print(f"Events: {results['events_processed']} in {elapsed:.2f}s ({results['engine']})\n")
+
+    if not results['variants']:
         print("No data available yet. Check back once visitors have been tracked.")
         return
-    
-    # Display results for each variant
-    results = []
-    for variant in sorted(variant_stats.keys()):
-        stats = variant_stats[variant]
-        
-        total_visits = stats['total_visits']
-        registrations = stats['registrations']
-        unique_visitors = len(stats['unique_visitors'])
-        unique_registrants = len(stats['unique_registrants'])
-        
-        # Calculate conversion rates
-        conversion_rate = (registrations / total_visits * 100) if total_visits > 0 else 0
-        visitor_conversion = (unique_registrants / unique_visitors * 100) if unique_visitors > 0 else 0
-        
-        results.append({
-            'variant': variant,
-            'total_visits': total_visits,
-            'registrations': registrations,
-            'unique_visitors': unique_visitors,
-            'unique_registrants': unique_registrants,
-            'conversion_rate': conversion_rate,
-            'visitor_conversion': visitor_conversion,
-            'visitor_names': stats['visitor_names'],
-            'page_views': stats['page_views']
-        })
-    
-    # Print results table
-    print(f"{'Variant':<10} {'Visits':<10} {'Registrations':<15} {'Conv. Rate':<12} {'Unique Visitors':<18} {'Visitor Conv.':<15}")
-    print("-" * 90)
-    
-    for result in sorted(results, key=lambda x: x['variant']):
-        print(f"Variant {result['variant']:<3} {result['total_visits']:<10} {result['registrations']:<15} {result['conversion_rate']:>10.1f}% {result['unique_visitors']:<18} {result['visitor_conversion']:>13.1f}%")
-    
-    # Show registrants by variant
-    print("\n" + "="*70)
-    print("REGISTRANTS BY VARIANT")
-    print("="*70)
-    
-    for result in sorted(results, key=lambda x: x['variant']):
-        print(f"\nVariant {result['variant']}: {len(result['visitor_names'])} registrations")
-        if result['visitor_names']:
-            for name in sorted(set(result['visitor_names'])):
-                print(f"  ✓ {name}")
-        else:
-            print("  (No registrants yet)")
-    
-    # Show page views by variant
+
+    print(f"{'Variant':<10} {'Visits':<10} {'Visitors':<10} {'Registrations':<15} {'Conv. Rate':>10}")
+    print("-" * 60)
+    for variant, stats in results['variants'].items():
+        marker = ' (control)' if variant == results['control'] else ''
+        print(f"{variant:<10} {stats['visits']:<10} {stats['visitors']:<10} {stats['registrations']:<15} "
+              f"{stats['conversion_rate'] * 100:>9.2f}%{marker}")
+
     print("\n" + "="*70)
-    print("PAGE VIEWS BY VARIANT")
+    print(f"SIGNIFICANCE (vs control {results['control']})")
     print("="*70)
-    
-    for result in sorted(results, key=lambda x: x['variant']):
-        print(f"\nVariant {result['variant']}:")
-        for page, count in sorted(result['page_views'].items(), key=lambda x: x[1], reverse=True):
-            print(f"  {page}: {count} views")
-    
-    # Winner determination
+    for variant, comparison in results['comparisons'].items():
+        low, high = comparison['ci_95']
+        verdict = '✅ significant' if comparison['significant'] else '⚠️  not significant'
+        print(f"\nVariant {variant}: {comparison['difference'] * 100:+.2f} pts "
+              f"(95% CI {low * 100:+.2f} to {high * 100:+.2f})")
+        print(f"   z = {comparison['z']:.2f}, p = {comparison['p_value']:.4f} - {verdict}")
+        print(f"   P(beats control) = {comparison['prob_beats_control'] * 100:.1f}%")
+
     print("\n" + "="*70)
-    print("PRELIMINARY WINNER")
+    print("PROBABILITY TO BE BEST")
     print("="*70)
-    
-    if len(results) >= 2:
-        sorted_results = sorted(results, key=lambda x: x['conversion_rate'], reverse=True)
-        winner = sorted_results[0]
-        runner_up = sorted_results[1]
-        
-        difference = winner['conversion_rate'] - runner_up['conversion_rate']
-        
-        print(f"\n🏆 Variant {winner['variant']} is performing better!")
-        print(f"   Conversion Rate: {winner['conversion_rate']:.1f}% vs {runner_up['conversion_rate']:.1f}%")
-        print(f"   Difference: +{difference:.1f} percentage points")
-        
-        if winner['registrations'] >= 10:
-            print(f"\n✓ Sample size is adequate ({winner['registrations']} registrations)")
-        else:
-            print(f"\n⚠️  Sample size may be too small ({winner['registrations']} registrations) - continue testing")
-    
+    for variant, probability in results['prob_best'].items():
+        print(f"   {variant}: {probability * 100:.1f}%")
+
+    if results['winner']:
+        print(f"\n🏆 Variant {results['winner']} is the winner")
+    else:
+        print("\n⚠️  No clear winner yet - continue testing")
+
     print("\n" + "="*70 + "\n")
 
+def main():
+    start = time.time()
+    test, source = run_analysis(sys.argv[1:])
+    results = test.results()
+    print_report(results, source, time.time() - start)
+
 if __name__ == '__main__':
-    analyze_hook_ab_test()
+    main()
@@ -85,9 +85,12 @@ def restore_from_backup(backup_file=None):
     # Determine if it's analytics or registrations
     is_analytics = 'analytics' in os.path.basename(backup_file)
     
-    # Load data
+    # Load data (.json = full export, .jsonl = auto-backup segment, one row per line)
     with open(backup_file, 'r') as f:
-        data = json.load(f)
+        if backup_file.endswith('.jsonl'):
+            data = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = json.load(f)
     
     # Connect to database
     conn = sqlite3.connect(DB_FILE)
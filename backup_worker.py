@@ -0,0 +1,129 @@
+"""
+Background Backup Worker
+Runs a backup job on a daemon thread so no request ever waits on it.
+
+The job runs every `interval` seconds and whenever trigger() is called
+(e.g. every 100th insert); triggers that arrive while a run is in progress
+are coalesced into one follow-up run. close() (also registered with atexit)
+runs the job one last time so rows added just before shutdown are exported.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# Per-table watermarks of the incremental JSONL backups, kept next to the
+# segments so a wiped backup folder starts a full export
+STATE_FILE = 'backup_state.json'
+
+
+def json_default(value):
+    """json.dumps default for backup rows (datetimes as ISO strings)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def read_state(directory):
+    path = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_state(directory, state):
+    """Replace the state file atomically so a crash never leaves it half written"""
+    path = os.path.join(directory, STATE_FILE)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class BackupWorker:
+    """Daemon thread running `job` on demand and on a fixed interval
+
+    Args:
+        name: label used in log lines and stats
+        job: callable doing one backup pass; its return value is kept in stats
+        interval: seconds between scheduled runs (None/0 = only when triggered)
+    """
+
+    def __init__(self, name, job, interval=300.0):
+        self.name = name
+        self._job = job
+        self.interval = interval or None
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            'runs': 0,
+            'failures': 0,
+            'triggers': 0,
+            'last_run': None,
+            'last_duration': None,
+            'last_result': None,
+            'last_error': None,
+        }
+
+        self._thread = threading.Thread(target=self._run, name=f'{name}-worker', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def trigger(self):
+        """Ask for a run as soon as possible; never blocks"""
+        with self._lock:
+            self._stats['triggers'] += 1
+        self._wake.set()
+
+    def stats(self):
+        """Snapshot of worker counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot['pending'] = self._wake.is_set()
+        snapshot['interval'] = self.interval
+        return snapshot
+
+    def close(self, timeout=30.0):
+        """Stop the thread after one final run"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run_once(self):
+        started = time.monotonic()
+        try:
+            result = self._job()
+            with self._lock:
+                self._stats['runs'] += 1
+                self._stats['last_result'] = result
+                self._stats['last_error'] = None
+        except Exception as e:
+            with self._lock:
+                self._stats['failures'] += 1
+                self._stats['last_error'] = str(e)
+            print(f'⚠️ {self.name} failed: {e}')
+        finally:
+            with self._lock:
+                self._stats['last_run'] = time.time()
+                self._stats['last_duration'] = time.monotonic() - started
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            if self._stop.is_set():
+                break
+            self._wake.clear()
+            self._run_once()
+
+        # Shutdown: export whatever arrived since the last run
+        self._run_once()
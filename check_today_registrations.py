@@ -4,7 +4,7 @@ Quick script to check today's registrations
 Run this on your Replit server to see live data
 """
 
-from database import get_db
+from database_unified import get_db
 from datetime import datetime, timedelta
 
 def check_registrations():
@@ -21,12 +21,12 @@ def check_registrations():
         print('🔍 REGISTRATION REPORT')
         print('=' * 80)
         
-        # Today's registrations
+        # Today's registrations (counts come from the hourly rollups)
         cursor.execute('''
-            SELECT COUNT(*) as count 
-            FROM registrations 
-            WHERE DATE(timestamp) = ?
-        ''', (today,))
+            SELECT COALESCE(SUM(count), 0)::bigint as count 
+            FROM registrations_hourly 
+            WHERE bucket >= %s AND bucket < %s::date + 1
+        ''', (today, today))
         today_count = cursor.fetchone()['count']
         
         print(f'\n📅 Today ({today}): {today_count} registration(s)')
@@ -35,9 +35,9 @@ def check_registrations():
             cursor.execute('''
                 SELECT id, email, first_name, last_name, country, city, timestamp
                 FROM registrations 
-                WHERE DATE(timestamp) = ?
+                WHERE timestamp >= %s AND timestamp < %s::date + 1
                 ORDER BY timestamp DESC
-            ''', (today,))
+            ''', (today, today))
             
             registrations = cursor.fetchall()
             print('-' * 80)
@@ -45,17 +45,17 @@ def check_registrations():
                 name = f"{reg['first_name'] or ''} {reg['last_name'] or ''}".strip() or 'N/A'
                 country = reg['country'] or 'N/A'
                 city = reg['city'] or 'N/A'
-                time = reg['timestamp'].split('T')[1][:8] if 'T' in reg['timestamp'] else 'N/A'
+                time = reg['timestamp'].strftime('%H:%M:%S') if reg['timestamp'] else 'N/A'
                 print(f"  {time} | {name} | {reg['email']}")
                 print(f"           Location: {city}, {country}")
                 print()
         
         # Yesterday's registrations
         cursor.execute('''
-            SELECT COUNT(*) as count 
-            FROM registrations 
-            WHERE DATE(timestamp) = ?
-        ''', (yesterday,))
+            SELECT COALESCE(SUM(count), 0)::bigint as count 
+            FROM registrations_hourly 
+            WHERE bucket >= %s AND bucket < %s::date + 1
+        ''', (yesterday, yesterday))
         yesterday_count = cursor.fetchone()['count']
         
         print(f'📅 Yesterday ({yesterday}): {yesterday_count} registration(s)')
@@ -63,10 +63,11 @@ def check_registrations():
         # Last 7 days
         seven_days_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
         cursor.execute('''
-            SELECT DATE(timestamp) as date, COUNT(*) as count 
-            FROM registrations 
-            WHERE DATE(timestamp) >= ?
-            GROUP BY DATE(timestamp)
+            SELECT bucket::date as date, SUM(count)::bigint as count 
+            FROM registrations_hourly 
+            WHERE bucket >= %s
+            GROUP BY bucket::date
+            HAVING SUM(count) > 0
             ORDER BY date DESC
         ''', (seven_days_ago,))
         
@@ -82,7 +83,7 @@ def check_registrations():
         print(f'\n  Total: {total_week} registrations')
         
         # All-time stats
-        cursor.execute('SELECT COUNT(*) as count FROM registrations')
+        cursor.execute('SELECT COALESCE(SUM(count), 0)::bigint as count FROM registrations_hourly')
         total_count = cursor.fetchone()['count']
         
         cursor.execute('SELECT COUNT(DISTINCT visitor_id) as count FROM registrations WHERE visitor_id IS NOT NULL')
@@ -95,10 +96,11 @@ def check_registrations():
         
         # Top countries
         cursor.execute('''
-            SELECT country, COUNT(*) as count 
-            FROM registrations 
-            WHERE country IS NOT NULL AND country != ''
+            SELECT country, SUM(count)::bigint as count 
+            FROM registrations_hourly 
+            WHERE country != ''
             GROUP BY country 
+            HAVING SUM(count) > 0
             ORDER BY count DESC
             LIMIT 5
         ''')
@@ -112,12 +114,13 @@ def check_registrations():
         
         # Recent analytics events
         cursor.execute('''
-            SELECT event, COUNT(*) as count 
-            FROM analytics 
-            WHERE DATE(timestamp) = ?
+            SELECT event, SUM(count)::bigint as count 
+            FROM analytics_hourly 
+            WHERE bucket >= %s AND bucket < %s::date + 1
             GROUP BY event
+            HAVING SUM(count) > 0
             ORDER BY count DESC
-        ''', (today,))
+        ''', (today, today))
         
         events = cursor.fetchall()
         
@@ -0,0 +1,135 @@
+"""
+CRM Outbox Workers
+Deliver queued CRM syncs (rows in the crm_outbox table) in the background,
+so form submissions never wait on ClickFunnels.
+
+Each worker thread repeatedly claims a batch of due entries (SELECT ... FOR
+UPDATE SKIP LOCKED, see database_unified.claim_outbox_batch), calls the
+handler registered for the entry's kind, and records the outcome:
+delivered, retried later with exponential backoff, or dead-lettered after
+`max_attempts` tries or a non-retryable error.
+"""
+
+import random
+import threading
+import time
+
+
+class DeliveryError(Exception):
+    """Raised by a handler; retryable=False dead-letters the entry immediately"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def backoff_delay(attempts, base_delay=30.0, max_delay=3600.0):
+    """Seconds to wait before the next attempt: base * 2^(n-1), capped, +/-20% jitter"""
+    delay = min(base_delay * (2 ** max(attempts - 1, 0)), max_delay)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class OutboxWorkerPool:
+    """Background threads draining an outbox table
+
+    Args:
+        name: label used in log lines and stats
+        store: object with claim_outbox_batch(limit, lease_seconds),
+            complete_outbox(id) and fail_outbox(id, error, retry_in)
+        handlers: dict mapping entry kind -> callable(payload)
+        workers: number of delivery threads in this process
+        batch_size: entries claimed per round trip
+        poll_interval: seconds to sleep when nothing is due
+        max_attempts: attempts before an entry is dead-lettered
+        lease_seconds: how long a claimed entry is hidden from other workers
+    """
+
+    def __init__(self, name, store, handlers, workers=2, batch_size=10, poll_interval=1.0,
+                 max_attempts=8, lease_seconds=300, base_delay=30.0, max_delay=3600.0):
+        self.name = name
+        self.store = store
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            'delivered': 0,
+            'retried': 0,
+            'dead_lettered': 0,
+            'claim_errors': 0,
+        }
+        self._threads = [
+            threading.Thread(target=self._run, name=f'{name}-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def wake(self):
+        """Tell idle workers something was just queued"""
+        self._wake.set()
+
+    def stats(self):
+        """Snapshot of delivery counters for this process"""
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot['workers'] = len(self._threads)
+        return snapshot
+
+    def close(self, timeout=5.0):
+        """Stop the workers (undelivered entries stay in the table)"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def process_batch(self):
+        """Claim and deliver one batch; returns the number of entries handled"""
+        entries = self.store.claim_outbox_batch(self.batch_size, self.lease_seconds)
+        for entry in entries:
+            self._deliver(entry)
+        return len(entries)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _deliver(self, entry):
+        handler = self.handlers.get(entry['kind'])
+        try:
+            if handler is None:
+                raise DeliveryError(f"no handler for {entry['kind']}", retryable=False)
+            handler(entry['payload'])
+        except Exception as e:
+            retryable = getattr(e, 'retryable', True)
+            if not retryable or entry['attempts'] >= self.max_attempts:
+                self.store.fail_outbox(entry['id'], str(e), None)
+                self._count('dead_lettered')
+                print(f"❌ {self.name}: entry {entry['id']} dead-lettered after {entry['attempts']} attempt(s): {e}")
+            else:
+                delay = backoff_delay(entry['attempts'], self.base_delay, self.max_delay)
+                self.store.fail_outbox(entry['id'], str(e), delay)
+                self._count('retried')
+                print(f"⚠️ {self.name}: entry {entry['id']} failed, retrying in {delay:.0f}s: {e}")
+            return
+        self.store.complete_outbox(entry['id'])
+        self._count('delivered')
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                handled = self.process_batch()
+            except Exception as e:
+                self._count('claim_errors')
+                print(f'⚠️ {self.name}: could not claim outbox entries: {e}')
+                handled = 0
+            if handled < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
@@ -0,0 +1,244 @@
+"""
+PostgreSQL Connection Pool
+Keeps warm connections around so each request skips the TCP + auth + backend
+fork handshake. Used by database_unified.get_db().
+
+Configuration (environment variables):
+    DB_POOL_MIN           - connections opened eagerly and kept idle (default 1)
+    DB_POOL_MAX           - hard cap on open connections (default 10)
+    DB_POOL_TIMEOUT       - seconds to wait for a free connection (default 10)
+    DB_POOL_MAX_LIFETIME  - seconds before a connection is recycled (default 1800)
+    DB_POOL_MAX_IDLE      - seconds an idle connection may sit before it is
+                            health-checked with a round trip (default 30)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection became available within the checkout timeout"""
+
+
+class _PooledConnection:
+    """Bookkeeping wrapper around a raw DB-API connection"""
+
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections
+
+    Args:
+        connect: zero-argument callable that opens a new raw connection
+        minconn: connections to keep open at all times
+        maxconn: maximum number of connections (idle + in use)
+        timeout: seconds getconn() waits before raising PoolExhaustedError
+        max_lifetime: seconds after which a connection is closed and replaced
+        max_idle: idle seconds after which checkout runs a `SELECT 1` probe
+    """
+
+    def __init__(self, connect, minconn=1, maxconn=10, timeout=10.0,
+                 max_lifetime=1800.0, max_idle=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size: min={minconn}, max={maxconn}")
+
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+
+        self._lock = threading.Condition(threading.Lock())
+        self._idle = deque()
+        self._in_use = {}
+        self._opened = 0
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'health_check_failures': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'exhausted': 0,
+        }
+
+        for _ in range(minconn):
+            self._idle.append(_PooledConnection(self._connect()))
+            self._opened += 1
+            self._stats['connections_created'] += 1
+
+    def _discard(self, pooled):
+        """Close a connection and release its slot"""
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._opened -= 1
+            self._lock.notify()
+
+    def _is_healthy(self, pooled):
+        """Check a connection before handing it out"""
+        conn = pooled.conn
+        now = time.monotonic()
+        if now - pooled.created_at > self.max_lifetime:
+            with self._lock:
+                self._stats['connections_recycled'] += 1
+            return False
+
+        healthy = not getattr(conn, 'closed', 0)
+        if healthy and now - pooled.last_used > self.max_idle:
+            try:
+                cursor = conn.cursor()
+                cursor.execute('SELECT 1')
+                cursor.fetchall()
+                cursor.close()
+                conn.rollback()
+            except Exception:
+                healthy = False
+
+        if not healthy:
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+        return healthy
+
+    def getconn(self):
+        """Check out a connection, blocking up to `timeout` seconds"""
+        deadline = None
+        while True:
+            pooled = None
+            should_open = False
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    pooled = self._idle.pop()
+                elif self._opened < self.maxconn:
+                    # Reserve the slot before connecting outside the lock
+                    self._opened += 1
+                    should_open = True
+                else:
+                    if deadline is None:
+                        deadline = time.monotonic() + self.timeout
+                        self._stats['waits'] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['exhausted'] += 1
+                        raise PoolExhaustedError(
+                            f"No database connection available after {self.timeout}s "
+                            f"({self._opened}/{self.maxconn} in use)"
+                        )
+                    start = time.monotonic()
+                    self._lock.wait(remaining)
+                    self._stats['wait_time_total'] += time.monotonic() - start
+                    continue
+
+            if should_open:
+                try:
+                    pooled = _PooledConnection(self._connect())
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                        self._lock.notify()
+                    raise
+                with self._lock:
+                    self._stats['connections_created'] += 1
+            elif not self._is_healthy(pooled):
+                self._discard(pooled)
+                continue
+
+            with self._lock:
+                self._in_use[id(pooled.conn)] = pooled
+                self._stats['checkouts'] += 1
+            return pooled.conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool (or close it if it is broken)"""
+        with self._lock:
+            pooled = self._in_use.pop(id(conn), None)
+        if pooled is None:
+            raise ValueError("Connection does not belong to this pool")
+
+        if close or self._closed or getattr(conn, 'closed', 0):
+            self._discard(pooled)
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(pooled)
+            self._lock.notify()
+
+    def warm(self, count):
+        """Open idle connections until `count` are open (capped at maxconn)
+
+        Lets a known burst (e.g. an event start) find connections already
+        established instead of every request paying for its own handshake.
+
+        Returns:
+            Number of connections opened
+        """
+        opened = 0
+        while True:
+            with self._lock:
+                if self._closed or self._opened >= min(count, self.maxconn):
+                    return opened
+                self._opened += 1
+            try:
+                pooled = _PooledConnection(self._connect())
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._idle.appendleft(pooled)
+                self._stats['connections_created'] += 1
+                self._lock.notify()
+            opened += 1
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._lock.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self):
+        """Snapshot of pool usage and exhaustion metrics"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'min': self.minconn,
+                'max': self.maxconn,
+                'open': self._opened,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+            })
+        return snapshot
+
+
+def pool_from_env(connect):
+    """Build a ConnectionPool sized from DB_POOL_* environment variables"""
+    return ConnectionPool(
+        connect,
+        minconn=int(os.getenv('DB_POOL_MIN', '1')),
+        maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+        max_idle=float(os.getenv('DB_POOL_MAX_IDLE', '30')),
+    )
@@ -32,23 +32,25 @@ fi
 echo "✅ Found database_backups folder"
 echo ""
 
-# Check for latest backup files
-ANALYTICS_FILE=$(ls -t database_backups/analytics_latest.json 2>/dev/null | head -1)
-REGISTRATIONS_FILE=$(ls -t database_backups/registrations_latest.json 2>/dev/null | head -1)
+# Full exports (backup_database.py) and/or auto-backup segments
+# (one JSONL file per table per day, appended by the server)
+BACKUP_FILES=$(ls database_backups/analytics_latest.json database_backups/registrations_latest.json \
+    database_backups/analytics_*.jsonl database_backups/registrations_*.jsonl 2>/dev/null)
 
-if [ -z "$ANALYTICS_FILE" ] || [ -z "$REGISTRATIONS_FILE" ]; then
+if [ -z "$BACKUP_FILES" ]; then
     echo "❌ No backup files found in database_backups/"
     echo ""
     echo "📝 Expected files:"
-    echo "   - database_backups/analytics_latest.json"
-    echo "   - database_backups/registrations_latest.json"
+    echo "   - database_backups/analytics_latest.json / registrations_latest.json"
+    echo "   - database_backups/analytics_YYYY-MM-DD.jsonl / registrations_YYYY-MM-DD.jsonl"
     echo ""
     exit 1
 fi
 
 echo "📦 Found backup files:"
-echo "   - $ANALYTICS_FILE"
-echo "   - $REGISTRATIONS_FILE"
+for FILE in $BACKUP_FILES; do
+    echo "   - $FILE"
+done
 echo ""
 
 # Backup current database
@@ -61,8 +63,10 @@ fi
 
 # Restore from backup
 echo "🔄 Restoring database from Replit backups..."
-python3 backup_database.py restore "$ANALYTICS_FILE"
-python3 backup_database.py restore "$REGISTRATIONS_FILE"
+# Restores skip ids that already exist, so overlapping files are fine
+for FILE in $BACKUP_FILES; do
+    python3 backup_database.py restore "$FILE"
+done
 
 echo ""
 echo "✅ Database restored!"
@@ -0,0 +1,177 @@
+"""
+Offline IP Geolocation
+Answers /api/geolocation from a local IP-range dataset instead of a
+rate-limited external API.
+
+The dataset is a CSV with a header row:
+
+    start,end,country_code,country_name,region,city,timezone
+    1.0.0.0,1.0.0.255,AU,Australia,Queensland,Brisbane,Australia/Brisbane
+    2001:200::,2001:200:ffff:ffff:ffff:ffff:ffff:ffff,JP,Japan,Tokyo,Tokyo,Asia/Tokyo
+
+start/end are inclusive and may be written as addresses or as integers
+(as in IP2Location / DB-IP "lite" exports). Integers carry no address
+family, so it is decided per file: if any integer bound is above
+2^32 - 1 the file is an IPv6 export and all of its integer rows are IPv6
+(rows inside ::ffff:0:0/96, how those exports list IPv4 space, are stored
+as IPv4); otherwise they are IPv4. Ranges are loaded into sorted
+parallel arrays - IPv4 bounds in compact array('L') columns, IPv6 bounds
+as Python ints - and each distinct location is stored once. A lookup is a
+single binary search.
+"""
+
+import csv
+import ipaddress
+import os
+from array import array
+from bisect import bisect_right
+
+LOCATION_FIELDS = ('country_code', 'country_name', 'region', 'city', 'timezone')
+
+
+IPV4_MAX = 0xFFFFFFFF
+IPV4_MAPPED = 0xFFFF << 32  # ::ffff:0.0.0.0
+
+
+def _parse_address(value):
+    """Address or integer string -> (version, int); version is None for integers"""
+    value = value.strip()
+    if value.isdigit():
+        return None, int(value)
+    address = ipaddress.ip_address(value)
+    return address.version, int(address)
+
+
+class _RangeTable:
+    """Sorted, non-overlapping ranges with a location index per range"""
+
+    def __init__(self, starts, ends, locations):
+        self.starts = starts
+        self.ends = ends
+        self.locations = locations
+
+    def find(self, number):
+        i = bisect_right(self.starts, number) - 1
+        if i >= 0 and number <= self.ends[i]:
+            return self.locations[i]
+        return None
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class GeoIPDatabase:
+    """In-memory IP range -> location lookup for IPv4 and IPv6"""
+
+    def __init__(self, ipv4_ranges, ipv6_ranges, locations):
+        self._locations = locations
+        self._ipv4 = self._build(ipv4_ranges, array('L'), array('L'))
+        self._ipv6 = self._build(ipv6_ranges, [], [])
+
+    @classmethod
+    def load(cls, path):
+        """Load a dataset CSV (see module docstring for the format)"""
+        location_ids = {}
+        locations = []
+        ranges = {4: [], 6: [], None: []}
+
+        with open(path, newline='', encoding='utf-8') as f:
+            for line_number, row in enumerate(csv.DictReader(f), 2):
+                try:
+                    start_version, start = _parse_address(row['start'])
+                    end_version, end = _parse_address(row['end'])
+                except (KeyError, ValueError, AttributeError) as e:
+                    raise ValueError(f'{path}:{line_number}: bad address ({e})')
+                # An integer next to an address takes the address's family
+                version = start_version or end_version
+                if (start_version and end_version and start_version != end_version) or start > end \
+                        or (version == 4 and end > IPV4_MAX):
+                    raise ValueError(f'{path}:{line_number}: invalid range {row["start"]} - {row["end"]}')
+
+                location = tuple((row.get(field) or '').strip() for field in LOCATION_FIELDS)
+                location_id = location_ids.get(location)
+                if location_id is None:
+                    location_id = location_ids[location] = len(locations)
+                    locations.append(location)
+                ranges[version].append((start, end, location_id))
+
+        # Integer-only rows: IPv6 export if any bound is beyond IPv4 space
+        integer_rows = ranges.pop(None)
+        if any(end > IPV4_MAX for _, end, _ in integer_rows):
+            for start, end, location_id in integer_rows:
+                if IPV4_MAPPED <= start and end <= IPV4_MAPPED + IPV4_MAX:
+                    ranges[4].append((start - IPV4_MAPPED, end - IPV4_MAPPED, location_id))
+                else:
+                    ranges[6].append((start, end, location_id))
+        else:
+            ranges[4].extend(integer_rows)
+
+        return cls(ranges[4], ranges[6], locations)
+
+    @staticmethod
+    def _build(ranges, starts, ends):
+        ranges.sort()
+        location_index = array('L')
+        for start, end, location_id in ranges:
+            if len(ends) and start <= ends[-1]:
+                # Overlapping rows: the earlier range wins, trim this one
+                start = ends[-1] + 1
+                if start > end:
+                    continue
+            starts.append(start)
+            ends.append(end)
+            location_index.append(location_id)
+        return _RangeTable(starts, ends, location_index)
+
+    def lookup(self, ip):
+        """Location for an address, in the same shape ipapi.co returns
+
+        Returns None when the address is invalid, private, or not covered
+        by the dataset.
+        """
+        try:
+            address = ipaddress.ip_address(ip.strip())
+        except (ValueError, AttributeError):
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+
+        table = self._ipv4 if address.version == 4 else self._ipv6
+        location_id = table.find(int(address))
+        if location_id is None:
+            return None
+
+        country_code, country_name, region, city, timezone = self._locations[location_id]
+        return {
+            'ip': str(address),
+            'city': city or None,
+            'region': region or None,
+            'country': country_code or None,
+            'country_code': country_code or None,
+            'country_name': country_name or None,
+            'timezone': timezone or None,
+            'source': 'local',
+        }
+
+    def stats(self):
+        """Dataset size"""
+        return {
+            'ipv4_ranges': len(self._ipv4),
+            'ipv6_ranges': len(self._ipv6),
+            'locations': len(self._locations),
+        }
+
+
+def load_geoip_database(path):
+    """Load the dataset at `path`, or return None if it doesn't exist or can't be read"""
+    if not path or not os.path.exists(path):
+        print(f'⚠️ GeoIP dataset not found ({path}) - using external lookups only')
+        return None
+    try:
+        database = GeoIPDatabase.load(path)
+    except Exception as e:
+        print(f'⚠️ Could not load GeoIP dataset {path}: {e}')
+        return None
+    stats = database.stats()
+    print(f"✅ GeoIP dataset loaded: {stats['ipv4_ranges']} IPv4 + {stats['ipv6_ranges']} IPv6 ranges")
+    return database
@@ -0,0 +1,87 @@
+"""
+HyperLogLog
+Approximate distinct counting in fixed memory. A sketch is `2^precision`
+small registers; each value is hashed to one register, which keeps the
+longest run of leading zero bits seen there. Sketches of different days,
+pages or variants merge by taking the register-wise maximum, and the union
+can then be estimated - with a standard error of about 1.04 / sqrt(m).
+
+database_unified keeps the registers in PostgreSQL (see
+ANALYTICS_VISITORS_HLL_SQL there), hashed with hashtextextended(); this
+module has the estimator both sides share, plus an in-memory sketch.
+"""
+
+import hashlib
+import math
+
+DEFAULT_PRECISION = 10  # 1024 registers, ~3.3% standard error
+
+
+def _alpha(m):
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+
+def estimate(registers, precision=DEFAULT_PRECISION):
+    """Estimate the distinct count from {register index: rank}
+
+    Registers that were never set (missing from the mapping) count as 0.
+    """
+    m = 1 << precision
+    inverse_sum = (m - len(registers)) + sum(2.0 ** -rank for rank in registers.values())
+    raw = _alpha(m) * m * m / inverse_sum
+
+    zeros = m - sum(1 for rank in registers.values() if rank > 0)
+    if raw <= 2.5 * m and zeros:
+        # Small-range correction (linear counting)
+        return round(m * math.log(m / zeros))
+    return round(raw)
+
+
+def register_for(hash_value, precision=DEFAULT_PRECISION):
+    """(register index, rank) for a signed or unsigned 64-bit hash
+
+    The low `precision` bits pick the register; the rank is the position of
+    the first 1 bit in the remaining high bits, counted from the top.
+    """
+    hash_value &= (1 << 64) - 1
+    index = hash_value & ((1 << precision) - 1)
+    width = 64 - precision
+    high = hash_value >> precision
+    rank = width - high.bit_length() + 1
+    return index, rank
+
+
+class HyperLogLog:
+    """In-memory sketch (same register layout as the PostgreSQL one)"""
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"Invalid precision: {precision}")
+        self.precision = precision
+        self.registers = {}
+
+    def add(self, value):
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        self.add_hash(int.from_bytes(digest, 'big'))
+
+    def add_hash(self, hash_value):
+        index, rank = register_for(hash_value, self.precision)
+        if rank > self.registers.get(index, 0):
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        for index, rank in other.registers.items():
+            if rank > self.registers.get(index, 0):
+                self.registers[index] = rank
+        return self
+
+    def count(self):
+        return estimate(self.registers, self.precision)
@@ -0,0 +1,241 @@
+"""
+Outbound HTTP Client
+One shared layer for calls to third-party APIs (ClickFunnels, ipapi.co).
+
+- A requests.Session per host, so TLS connections are kept alive and reused
+  instead of re-handshaking on every call
+- A default (connect, read) timeout on every request - a hung upstream can
+  no longer pin a worker thread
+- A circuit breaker per host: after `failure_threshold` consecutive failures
+  (network errors, 429 or 5xx) calls fail fast with CircuitOpenError for
+  `reset_timeout` seconds, then a single trial request decides whether the
+  circuit closes again
+- Per-host latency and error counters for /api/http/stats
+
+Configuration (environment variables):
+    HTTP_CONNECT_TIMEOUT      - seconds to establish a connection (default 3)
+    HTTP_READ_TIMEOUT         - seconds to wait for a response (default 10)
+    HTTP_POOL_SIZE            - keep-alive connections per host (default 10)
+    HTTP_BREAKER_THRESHOLD    - consecutive failures that open a circuit (default 5)
+    HTTP_BREAKER_RESET        - seconds a circuit stays open (default 30)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling a host whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open after a cooldown
+
+    While half-open exactly one caller is let through; its outcome closes the
+    circuit or re-opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may be sent now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def retry_after(self):
+        """Seconds until an open circuit lets a trial request through"""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+class _HostStats:
+    """Request counters and a window of recent latencies for one host"""
+
+    def __init__(self, window=500):
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, seconds, ok):
+        self.requests += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+        if not ok:
+            self.errors += 1
+
+    def snapshot(self):
+        recent = sorted(self.recent)
+
+        def percentile(p):
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 1)
+
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'rejected': self.rejected,
+            'avg_ms': round(self.total_seconds / self.requests * 1000, 1) if self.requests else None,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(self.max_seconds * 1000, 1) if self.requests else None,
+        }
+
+
+class _Host:
+    __slots__ = ('session', 'breaker', 'stats')
+
+    def __init__(self, session, breaker, stats):
+        self.session = session
+        self.breaker = breaker
+        self.stats = stats
+
+
+class HttpClient:
+    """Keep-alive sessions, timeouts, circuit breakers and stats per host
+
+    Args:
+        timeout: default (connect, read) timeout in seconds
+        pool_size: keep-alive connections kept per host
+        failure_threshold: consecutive failures that open a host's circuit
+        reset_timeout: seconds an open circuit rejects calls
+    """
+
+    def __init__(self, timeout=(3.0, 10.0), pool_size=10, failure_threshold=5, reset_timeout=30.0):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _host(self, url):
+        parts = urlsplit(url)
+        key = f'{parts.scheme}://{parts.netloc}'
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: don't share the parent's sockets
+                self._hosts = {}
+                self._pid = os.getpid()
+            host = self._hosts.get(key)
+            if host is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount(f'{parts.scheme}://', adapter)
+                host = self._hosts[key] = _Host(
+                    session,
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout),
+                    _HostStats()
+                )
+            return key, host
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the host's session
+
+        Raises CircuitOpenError without sending anything while the host's
+        circuit is open; otherwise behaves like requests.request (the
+        response is returned whatever its status code).
+        """
+        key, host = self._host(url)
+        if not host.breaker.allow():
+            with self._lock:
+                host.stats.rejected += 1
+            raise CircuitOpenError(f'{key} circuit open, retry in {host.breaker.retry_after():.0f}s')
+
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = host.session.request(method, url, **kwargs)
+            ok = response.status_code != 429 and response.status_code < 500
+            return response
+        finally:
+            # Whatever was raised (not only RequestException), the outcome
+            # is recorded - a half-open circuit would otherwise keep its
+            # trial marked in flight and refuse every later call
+            self._record(host, time.perf_counter() - started, ok=ok)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _record(self, host, seconds, ok):
+        if ok:
+            host.breaker.record_success()
+        else:
+            host.breaker.record_failure()
+        with self._lock:
+            host.stats.record(seconds, ok)
+
+    def stats(self):
+        """Per-host latency, error and circuit state"""
+        with self._lock:
+            hosts = list(self._hosts.items())
+            snapshots = {key: host.stats.snapshot() for key, host in hosts}
+        for key, host in hosts:
+            snapshots[key]['circuit'] = host.breaker.state
+            snapshots[key]['circuit_opened'] = host.breaker.times_opened
+        return snapshots
+
+    def close(self):
+        """Close every keep-alive connection"""
+        with self._lock:
+            hosts, self._hosts = list(self._hosts.values()), {}
+        for host in hosts:
+            host.session.close()
+
+
+def client_from_env():
+    """Build an HttpClient configured from HTTP_* environment variables"""
+    return HttpClient(
+        timeout=(float(os.getenv('HTTP_CONNECT_TIMEOUT', '3')), float(os.getenv('HTTP_READ_TIMEOUT', '10'))),
+        pool_size=int(os.getenv('HTTP_POOL_SIZE', '10')),
+        failure_threshold=int(os.getenv('HTTP_BREAKER_THRESHOLD', '5')),
+        reset_timeout=float(os.getenv('HTTP_BREAKER_RESET', '30')),
+    )
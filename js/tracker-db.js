@@ -17,6 +17,87 @@ console.log('🔔 Session ID for this page view:', sessionId);
 
 let pageEntryTime = Date.now();
 
+// Event queue - events are sent together to /api/analytics/track/batch
+// on a timer, when the queue fills up, and on pagehide via sendBeacon
+const TRACK_BATCH_URL = '/api/analytics/track/batch';
+const FLUSH_INTERVAL_MS = 5000;
+const MAX_BATCH_SIZE = 20;
+const MAX_QUEUED_EVENTS = 200;
+let eventQueue = [];
+let flushTimer = null;
+let exitTracked = false;
+
+// Unique ID per event so the server can ignore a batch that gets re-sent
+function generateEventId() {
+    return 'evt_' + Date.now() + '_' + Math.random().toString(36).substr(2, 9);
+}
+
+function queueEvent(data) {
+    data.eventId = data.eventId || generateEventId();
+    eventQueue.push(data);
+
+    // Drop the oldest events if the server has been unreachable for a while
+    if (eventQueue.length > MAX_QUEUED_EVENTS) {
+        eventQueue.splice(0, eventQueue.length - MAX_QUEUED_EVENTS);
+    }
+
+    if (eventQueue.length >= MAX_BATCH_SIZE) {
+        flushEvents();
+    } else if (!flushTimer) {
+        flushTimer = setTimeout(flushEvents, FLUSH_INTERVAL_MS);
+    }
+}
+
+// Send queued events with fetch (normal) or sendBeacon (page is going away)
+async function flushEvents(useBeacon = false) {
+    if (flushTimer) {
+        clearTimeout(flushTimer);
+        flushTimer = null;
+    }
+    if (eventQueue.length === 0) return;
+
+    const batch = eventQueue;
+    eventQueue = [];
+
+    if (useBeacon && navigator.sendBeacon) {
+        const blob = new Blob([JSON.stringify({ events: batch })], { type: 'application/json' });
+        if (navigator.sendBeacon(TRACK_BATCH_URL, blob)) {
+            console.log('✅ Flushed', batch.length, 'events via beacon');
+            return;
+        }
+    }
+
+    try {
+        const response = await fetch(TRACK_BATCH_URL, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ events: batch }),
+            keepalive: useBeacon
+        });
+
+        if (response.ok) {
+            const result = await response.json();
+            console.log('✅ Flushed', batch.length, 'events! IDs:', result.ids);
+        } else {
+            console.error('❌ Error flushing events:', response.status);
+            if (response.status >= 500) requeueEvents(batch);
+        }
+    } catch (error) {
+        console.error('❌ Error flushing events:', error);
+        requeueEvents(batch);
+    }
+}
+
+// Put a failed batch back at the front of the queue for the next flush
+function requeueEvents(batch) {
+    eventQueue = batch.concat(eventQueue).slice(-MAX_QUEUED_EVENTS);
+    if (!flushTimer) {
+        flushTimer = setTimeout(flushEvents, FLUSH_INTERVAL_MS);
+    }
+}
+
 // Helper function to get URL parameters
 function getURLParameter(name) {
     const urlParams = new URLSearchParams(window.location.search);
@@ -119,29 +200,17 @@ async function trackPageVisit() {
         data.country = urlCountry;
     }
 
-    // Save to database via API
-    try {
-        const response = await fetch('/api/analytics/track', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(data)
-        });
-        
-        if (response.ok) {
-            const result = await response.json();
-            console.log('✅ Page visit tracked! ID:', result.id);
-        } else {
-            console.error('❌ Error tracking page visit:', response.status);
-        }
-    } catch (error) {
-        console.error('❌ Error tracking page visit:', error);
-    }
+    // Queue for the next batch (sent by the flush timer or the exit beacon)
+    queueEvent(data);
+    console.log('✅ Page visit tracked! ID:', data.eventId);
 }
 
 // Track page exit
 async function trackPageExit() {
+    // beforeunload and pagehide can both fire - only record one exit
+    if (exitTracked) return;
+    exitTracked = true;
+
     const duration = Math.round((Date.now() - pageEntryTime) / 1000);
     
     const data = {
@@ -158,9 +227,10 @@ async function trackPageExit() {
     }
 
     try {
-        // Use sendBeacon for reliable exit tracking (doesn't block page unload)
-        const blob = new Blob([JSON.stringify(data)], { type: 'application/json' });
-        navigator.sendBeacon('/api/analytics/track', blob);
+        // Exit event rides along with anything still queued in one beacon
+        // (sendBeacon doesn't block page unload)
+        queueEvent(data);
+        flushEvents(true);
         console.log('✅ Page exit tracked! Duration:', duration, 'seconds');
     } catch (error) {
         console.log('⚠️ Exit tracking error:', error);
@@ -183,23 +253,8 @@ async function trackButtonClick(buttonName) {
         data.hookVariant = window.__HOOK_VARIANT__.id;
     }
 
-    try {
-        const response = await fetch('/api/analytics/track', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(data)
-        });
-        
-        if (response.ok) {
-            console.log('✅ Button click tracked:', buttonName);
-        } else {
-            console.error('❌ Error tracking button click:', response.status);
-        }
-    } catch (error) {
-        console.error('❌ Error tracking button click:', error);
-    }
+    queueEvent(data);
+    console.log('✅ Button click tracked:', buttonName);
 }
 
 // Track registrations
@@ -249,11 +304,22 @@ if (document.readyState === 'loading') {
 window.addEventListener('beforeunload', trackPageExit);
 window.addEventListener('pagehide', trackPageExit);
 
+// Page restored from the back/forward cache: this is a new stay on the page,
+// so its exit has to be recorded again
+window.addEventListener('pageshow', function(event) {
+    if (event.persisted) {
+        exitTracked = false;
+        pageEntryTime = Date.now();
+    }
+});
+
 // Track visibility changes
 let visibilityChangeTime = Date.now();
 document.addEventListener('visibilitychange', function() {
     if (document.hidden) {
         visibilityChangeTime = Date.now();
+        // Mobile browsers may never fire pagehide after this - send what we have
+        flushEvents(true);
     } else {
         const awayTime = Date.now() - visibilityChangeTime;
         if (awayTime > 1000) {
@@ -303,3 +369,4 @@ document.addEventListener('click', function(e) {
 window.trackButtonClick = trackButtonClick;
 window.trackRegistration = trackRegistration;
 window.trackPageVisit = trackPageVisit;
+window.flushTrackedEvents = flushEvents;
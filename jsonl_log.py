@@ -0,0 +1,130 @@
+"""
+Append-Only JSONL Log
+Daily newline-delimited JSON files (<prefix>-YYYY-MM-DD.jsonl) that many
+processes can append to safely.
+
+Each record is one os.write() of a complete line to a file opened with
+O_APPEND, under an exclusive flock so lines from different gunicorn workers
+never interleave. Appends don't fsync; a background thread fsyncs dirty
+files every `fsync_interval` seconds (and once more at exit), so a burst of
+writes costs one disk flush instead of one per record.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows - only the in-process lock applies
+    fcntl = None
+
+from backup_worker import BackupWorker
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class JsonlWriter:
+    """Process-safe appender for daily JSONL files
+
+    Args:
+        directory: folder holding the log files (created if missing)
+        prefix: file name prefix, e.g. 'registrations'
+        fsync_interval: maximum seconds an appended record waits for fsync
+    """
+
+    def __init__(self, directory, prefix, fsync_interval=0.5):
+        self.directory = directory
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._fd = None
+        self._fd_pid = None
+        self._path = None
+        self._dirty = False
+        self._syncer = BackupWorker(f'{prefix}-fsync', self.sync, interval=fsync_interval)
+
+    def path_for(self, day):
+        """Log file for a given date"""
+        return os.path.join(self.directory, f'{self.prefix}-{day:%Y-%m-%d}.jsonl')
+
+    def append(self, record):
+        """Append one record as a JSON line; returns the file it was written to"""
+        line = (json.dumps(record, default=_json_default) + '\n').encode('utf-8')
+        with self._lock:
+            fd = self._current_fd()
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                os.write(fd, line)
+            finally:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            self._dirty = True
+            return self._path
+
+    def sync(self):
+        """fsync the current file if anything was appended since the last sync"""
+        with self._lock:
+            if self._fd is None or not self._dirty:
+                return False
+            os.fsync(self._fd)
+            self._dirty = False
+            return True
+
+    def close(self):
+        """Flush pending appends to disk and close the file"""
+        self._syncer.close()
+        with self._lock:
+            self._close_fd()
+
+    def _current_fd(self):
+        """Open (or rotate to) today's file; reopen after a fork"""
+        path = self.path_for(datetime.now())
+        pid = os.getpid()
+        if self._fd is not None and (path != self._path or pid != self._fd_pid):
+            self._close_fd()
+        if self._fd is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._fd_pid = pid
+            self._path = path
+        return self._fd
+
+    def _close_fd(self):
+        if self._fd is None:
+            return
+        if self._dirty and self._fd_pid == os.getpid():
+            os.fsync(self._fd)
+        os.close(self._fd)
+        self._fd = None
+        self._path = None
+        self._dirty = False
+
+
+def read_records(path):
+    """Yield records from a backup file one at a time
+
+    .jsonl files are streamed line by line; a torn last line (process killed
+    mid-write) is skipped. Older .json files holding a single array are
+    still supported.
+    """
+    if path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f'⚠️ Skipping unreadable line {line_number} in {path}')
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            yield from data
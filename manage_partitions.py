@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Manage the monthly partitions of the analytics table.
+
+The server creates upcoming partitions on startup and every 12 hours, so
+`ensure` is only needed by hand after changing
+ANALYTICS_PARTITION_MONTHS_AHEAD. `detach` removes whole months from the
+analytics table in one catalog change. The hourly rollups are kept, so
+all-time counts don't change.
+
+Usage:
+    python3 manage_partitions.py list
+    python3 manage_partitions.py ensure [MONTHS_AHEAD]
+    python3 manage_partitions.py detach YYYY-MM-DD [--drop]
+"""
+
+import sys
+
+import database_unified as database
+
+def list_partitions():
+    print('📅 Analytics partitions:')
+    print('-' * 80)
+    for partition in database.get_analytics_partitions():
+        if partition['default']:
+            bounds = 'DEFAULT (out of range rows)'
+        else:
+            start = partition['start'].strftime('%Y-%m-%d') if partition['start'] else 'MINVALUE'
+            end = partition['end'].strftime('%Y-%m-%d') if partition['end'] else 'MAXVALUE'
+            bounds = f'{start} → {end}'
+        print(f"  {partition['name']:<24} {bounds:<32} ~{partition['estimated_rows']} rows")
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('list', 'ensure', 'detach'):
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == 'list':
+        list_partitions()
+
+    elif command == 'ensure':
+        months_ahead = int(sys.argv[2]) if len(sys.argv) > 2 else database.ANALYTICS_PARTITION_MONTHS_AHEAD
+        created = database.ensure_analytics_partitions(months_ahead)
+        print(f"✅ Created: {', '.join(created) if created else 'nothing (already up to date)'}")
+
+    elif command == 'detach':
+        if len(sys.argv) < 3:
+            print('❌ detach needs a cutoff date, e.g. 2025-01-01')
+            sys.exit(1)
+        drop = '--drop' in sys.argv[3:]
+        detached = database.detach_analytics_partitions(sys.argv[2], drop=drop)
+        action = 'Dropped' if drop else 'Detached'
+        print(f"✅ {action}: {', '.join(detached) if detached else 'no partitions end before that date'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+Metrics
+In-process counters and latency histograms rendered in the Prometheus text
+exposition format (served at /metrics).
+
+Recording is built for request hot paths: one dict lookup, a bisect over
+the bucket bounds and a few integer increments under an uncontended lock -
+no allocation once a label combination has been seen. Everything else
+(cumulative buckets, component stats such as cache hit ratios and queue
+depths) is worked out only when /metrics is scraped.
+
+Counters live in the process that recorded them. Under gunicorn each worker
+keeps its own, so every series carries a `worker` label (the pid) and
+Prometheus sums them with e.g. sum without (worker) (...).
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers in-memory hits (sub-millisecond) up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        """Add amount to the series for the label values tuple"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [(self.name, labels, (), value) for labels, value in sorted(values)]
+
+
+class Histogram:
+    """Observation counts per bucket, plus their sum and count, per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        """Record one observation (seconds, for latency histograms)"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[:-1]) if series else 0
+
+    def time(self, labels=(), errors=None):
+        """Decorator observing each call's duration; failures also count in errors"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    if errors is not None:
+                        errors.inc(labels)
+                    raise
+                finally:
+                    self.observe(labels, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        samples = []
+        for labels, values in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', labels, (('le', _number(bound)),), cumulative))
+            samples.append((f'{self.name}_sum', labels, (), values[-1]))
+            samples.append((f'{self.name}_count', labels, (), cumulative))
+        return samples
+
+
+class Collected:
+    """Metric read from a callback at scrape time (queue depths, cache stats)
+
+    The callback returns a number, or a dict of label values tuple -> number.
+    """
+
+    def __init__(self, name, documentation, callback, labelnames=(), kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def samples(self):
+        values = self.callback()
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name, labels, (), value) for labels, value in sorted(values.items())
+                if value is not None]
+
+
+class Registry:
+    """Named metrics of one process, rendered together"""
+
+    def __init__(self, worker_label=True):
+        self.worker_label = worker_label
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collect(self, name, documentation, callback, labelnames=(), kind='gauge'):
+        return self._register(Collected(name, documentation, callback, labelnames, kind))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        # Read at scrape time: workers forked from a preloaded app share the
+        # registry object but not the pid
+        const_labels = (('worker', os.getpid()),) if self.worker_label else ()
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                # A broken component shouldn't take the whole scrape down
+                lines.append(f'# {metric.name} unavailable: {_escape(e)}')
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, extra, value in samples:
+                label_text = _labels(metric.labelnames, labels, extra + const_labels)
+                lines.append(f'{name}{label_text} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def instrument(module, names, histogram, errors=None):
+    """Replace module.<name> with a version timed into histogram under label (name,)
+
+    Callers that look the function up on the module (database.insert_analytics)
+    are timed from then on; references taken before this call are not.
+    """
+    for name in names:
+        func = getattr(module, name)
+        setattr(module, name, histogram.time((name,), errors)(func))
+
+
+registry = Registry()
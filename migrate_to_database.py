@@ -9,7 +9,11 @@ import glob
 import requests
 import base64
 import re
-from database import init_db, insert_analytics, insert_registration
+from storage import get_storage
+from jsonl_log import read_records
+
+# Migrates into the configured backend (STORAGE_BACKEND)
+storage = get_storage()
 
 def migrate_from_backups():
     """Migrate data from local backup JSON files"""
@@ -20,42 +24,43 @@ def migrate_from_backups():
         print('⚠️  No backups directory found')
         return 0
     
-    backup_files = sorted(glob.glob(os.path.join(backup_dir, 'registrations-*.json')))
+    backup_files = sorted(
+        glob.glob(os.path.join(backup_dir, 'registrations-*.jsonl'))
+        + glob.glob(os.path.join(backup_dir, 'registrations-*.json'))
+    )
     
     count = 0
     for backup_file in backup_files:
         print(f'  Processing {backup_file}...')
         try:
-            with open(backup_file, 'r') as f:
-                registrations = json.load(f)
-                if isinstance(registrations, list):
-                    for reg in registrations:
-                        # Convert field names to match database expectations
-                        data = {
-                            'email': reg.get('email') or reg.get('emailAddress'),
-                            'firstName': reg.get('firstName') or reg.get('first_name'),
-                            'lastName': reg.get('lastName') or reg.get('last_name'),
-                            'phone': reg.get('phone'),
-                            'country': reg.get('country'),
-                            'city': reg.get('city'),
-                            'region': reg.get('region'),
-                            'timezone': reg.get('timezone'),
-                            'ipAddress': reg.get('ipAddress') or reg.get('ip_address'),
-                            'visitorId': reg.get('visitorId') or reg.get('visitor_id'),
-                            'sessionId': reg.get('sessionId') or reg.get('session_id'),
-                            'hookVariant': reg.get('hookVariant') or reg.get('hook_variant') or reg.get('variant'),
-                            'referrer': reg.get('referrer'),
-                            'utmSource': reg.get('utmSource') or reg.get('utm_source'),
-                            'utmMedium': reg.get('utmMedium') or reg.get('utm_medium'),
-                            'utmCampaign': reg.get('utmCampaign') or reg.get('utm_campaign'),
-                            'utmContent': reg.get('utmContent') or reg.get('utm_content'),
-                            'timestamp': reg.get('timestamp')
-                        }
-                        
-                        if data['email']:  # Only insert if email exists
-                            result = insert_registration(data)
-                            if result:
-                                count += 1
+            # Streamed one record at a time (.jsonl logs and older .json arrays)
+            for reg in read_records(backup_file):
+                # Convert field names to match database expectations
+                data = {
+                    'email': reg.get('email') or reg.get('emailAddress'),
+                    'firstName': reg.get('firstName') or reg.get('first_name'),
+                    'lastName': reg.get('lastName') or reg.get('last_name'),
+                    'phone': reg.get('phone'),
+                    'country': reg.get('country'),
+                    'city': reg.get('city'),
+                    'region': reg.get('region'),
+                    'timezone': reg.get('timezone'),
+                    'ipAddress': reg.get('ipAddress') or reg.get('ip_address'),
+                    'visitorId': reg.get('visitorId') or reg.get('visitor_id'),
+                    'sessionId': reg.get('sessionId') or reg.get('session_id'),
+                    'hookVariant': reg.get('hookVariant') or reg.get('hook_variant') or reg.get('variant'),
+                    'referrer': reg.get('referrer'),
+                    'utmSource': reg.get('utmSource') or reg.get('utm_source'),
+                    'utmMedium': reg.get('utmMedium') or reg.get('utm_medium'),
+                    'utmCampaign': reg.get('utmCampaign') or reg.get('utm_campaign'),
+                    'utmContent': reg.get('utmContent') or reg.get('utm_content'),
+                    'timestamp': reg.get('timestamp')
+                }
+                
+                if data['email']:  # Only insert if email exists
+                    result = storage.insert_registration(data)
+                    if result:
+                        count += 1
         except Exception as e:
             print(f'  ❌ Error processing {backup_file}: {e}')
     
@@ -151,7 +156,7 @@ def migrate_from_github():
                                         }
                                         
                                         if data['email']:
-                                            result = insert_registration(data)
+                                            result = storage.insert_registration(data)
                                             if result:
                                                 registration_count += 1
                                     else:
@@ -183,7 +188,7 @@ def migrate_from_github():
                                             'utmContent': event.get('utmContent') or event.get('utm_content')
                                         }
                                         
-                                        insert_analytics(data)
+                                        storage.insert_analytics(data)
                                         analytics_count += 1
                                         
                 except Exception as e:
@@ -201,7 +206,7 @@ def main():
     
     # Initialize database
     print('📊 Initializing database...')
-    init_db()
+    storage.init_db()
     print()
     
     # Migrate from backups
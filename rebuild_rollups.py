@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Rebuild the hourly rollup tables (analytics_hourly, registrations_hourly,
+analytics_breakdown_hourly) and the unique-visitor sketches
+(analytics_visitors_hll, analytics_visitors_hourly_hll) from the raw
+analytics and registrations tables.
+
+The rollups are kept up to date on every insert/delete, so this is only
+needed to backfill after importing data directly into the raw tables or to
+repair drift. Inserts wait while the rebuild runs.
+
+Usage: python3 rebuild_rollups.py
+"""
+
+import time
+
+import database_unified as database
+
+def main():
+    print('🔄 Rebuilding hourly rollups...')
+    start = time.time()
+    result = database.rebuild_rollups()
+    elapsed = time.time() - start
+    print(f"✅ analytics_hourly: {result['analytics_hourly']} rows")
+    print(f"✅ registrations_hourly: {result['registrations_hourly']} rows")
+    print(f"✅ analytics_breakdown_hourly: {result['analytics_breakdown_hourly']} rows")
+    print(f"✅ analytics_visitors_hll: {result['analytics_visitors_hll']} rows")
+    print(f"✅ analytics_visitors_hourly_hll: {result['analytics_visitors_hourly_hll']} rows")
+    print(f'⏱️  Done in {elapsed:.1f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Response Encoding
+Content negotiation helpers for the JSON list and aggregate endpoints:
+
+- gzip or brotli compression picked from the Accept-Encoding header
+  (brotli needs the `Brotli` package from requirements.txt; without it
+  only gzip is offered)
+- a columnar JSON shape - one array per column instead of one object per
+  row - so column names aren't repeated for every row
+- an in-memory cache of finished (compressed) bodies. Callers put the data
+  version the body was built from into the key, so a new write simply makes
+  old entries unreachable and repeated dashboard loads skip both the query
+  and the compression.
+"""
+
+import threading
+import zlib
+
+from ttl_cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional - gzip is always available
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+
+def choose_encoding(accept_encoding):
+    """Best supported content-coding for an Accept-Encoding header, or None
+
+    Honours q-values ("gzip;q=0", "*") and prefers brotli on ties.
+    """
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class Compressor:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == 'gzip':
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 = gzip container
+        else:
+            raise ValueError(f'Unsupported encoding: {encoding}')
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.finish() if self.encoding == 'br' else self._compressor.flush()
+
+
+def compress(data, encoding):
+    """Compress a whole body"""
+    compressor = Compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def to_columnar(rows):
+    """[{'a': 1, 'b': 2}, {'a': 3, 'b': 4}] -> {'count': 2, 'columns': {'a': [1, 3], 'b': [2, 4]}}
+
+    Accepts any iterable of dicts with the same keys (e.g. a streaming
+    cursor); only the column lists are kept in memory.
+    """
+    columns = None
+    count = 0
+    for row in rows:
+        if columns is None:
+            columns = {key: [] for key in row}
+        for key, values in columns.items():
+            values.append(row.get(key))
+        count += 1
+    return {'count': count, 'columns': columns or {}}
+
+
+class EncodedBodyCache:
+    """Finished response bodies keyed by request, encoding and data version
+
+    Args:
+        maxsize: number of bodies kept (least recently used are dropped)
+        max_body_bytes: larger bodies are served but never cached
+        ttl: upper bound on an entry's age, as a safety net for writes that
+            bypass the version triggers
+    """
+
+    def __init__(self, maxsize=64, max_body_bytes=8 * 1024 * 1024, ttl=3600.0):
+        self.max_body_bytes = max_body_bytes
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, negative_ttl=0)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stored': 0, 'too_large': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get(self, key):
+        entry = self._cache.get(key)
+        self._count('hits' if entry is not None else 'misses')
+        return entry
+
+    def set(self, key, body, encoding, mimetype):
+        if len(body) > self.max_body_bytes:
+            self._count('too_large')
+            return
+        self._cache.set(key, (body, encoding, mimetype))
+        self._count('stored')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        cache_stats = self._cache.stats()
+        stats.update({
+            'size': cache_stats['size'],
+            'maxsize': cache_stats['maxsize'],
+            'evictions': cache_stats['evictions'],
+            'max_body_bytes': self.max_body_bytes,
+            'encodings': list(supported_encodings()),
+        })
+        return stats
@@ -0,0 +1,131 @@
+"""
+Settings Cache
+Keeps the (small, rarely changing) settings table in process memory so
+landing-page reads like `site_closed` never wait on PostgreSQL.
+
+A background thread holds a dedicated connection that LISTENs on a channel.
+Writes to the settings table NOTIFY that channel on commit (see the
+settings_changed trigger in database_unified), and every worker process
+reloads its snapshot within milliseconds.
+
+While the listener is disconnected the cache can't know about changes, so
+reads fall back to loading from the database until it has reconnected and
+resynced.
+"""
+
+import select
+import threading
+
+
+class SettingsCache:
+    """In-process snapshot of a table, refreshed on NOTIFY
+
+    Args:
+        load: callable returning (version, settings) from the database in
+            one snapshot; a lower version than the current one is ignored
+        connect: callable opening a new raw connection for LISTEN
+        channel: notification channel name
+        poll_interval: seconds between checks of the stop flag
+        retry_delay: seconds to wait before reconnecting a lost listener
+    """
+
+    def __init__(self, load, connect, channel, poll_interval=1.0, retry_delay=5.0):
+        self._load = load
+        self._connect = connect
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+
+        self._lock = threading.Lock()
+        self._snapshot = None  # (version, settings)
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._stats = {
+            'hits': 0,
+            'fallback_reads': 0,
+            'refreshes': 0,
+            'notifications': 0,
+            'reconnects': 0,
+        }
+        self._thread = threading.Thread(target=self._run, name=f'{channel}-listener', daemon=True)
+        self._thread.start()
+
+    def wait_synced(self, timeout=None):
+        """Block until the first snapshot is loaded (used to warm at boot)"""
+        return self._synced.wait(timeout)
+
+    def get_all(self):
+        """Current settings dict (from memory while the listener is in sync)"""
+        if self._synced.is_set():
+            with self._lock:
+                self._stats['hits'] += 1
+                return self._snapshot[1]
+        with self._lock:
+            self._stats['fallback_reads'] += 1
+        return self._load()[1]
+
+    def version(self):
+        """Version of the cached snapshot, or None while out of sync"""
+        if not self._synced.is_set():
+            return None
+        with self._lock:
+            return self._snapshot[0]
+
+    def refresh(self):
+        """Reload the snapshot now (also called after this process writes)"""
+        version, settings = self._load()
+        with self._lock:
+            if self._snapshot is None or version >= self._snapshot[0]:
+                self._snapshot = (version, settings)
+            self._stats['refreshes'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['version'] = self._snapshot[0] if self._snapshot else None
+            stats['keys'] = len(self._snapshot[1]) if self._snapshot else 0
+        stats['synced'] = self._synced.is_set()
+        return stats
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(self.poll_interval + 1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.autocommit = True
+                conn.cursor().execute(f'LISTEN {self.channel}')
+                # LISTEN first, then load: nothing committed after the load
+                # can slip by without a notification
+                self.refresh()
+                self._synced.set()
+                self._listen(conn)
+            except Exception as e:
+                self._synced.clear()
+                print(f'⚠️ {self.channel} listener lost ({e}); reading settings from the database')
+                with self._lock:
+                    self._stats['reconnects'] += 1
+                self._stop.wait(self.retry_delay)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+        self._synced.clear()
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([conn], [], [], self.poll_interval)
+            if not ready:
+                continue
+            conn.poll()
+            if conn.notifies:
+                count = len(conn.notifies)
+                conn.notifies.clear()
+                with self._lock:
+                    self._stats['notifications'] += count
+                self.refresh()
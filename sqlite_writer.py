@@ -0,0 +1,213 @@
+"""
+SQLite Writer
+SQLite allows one writer at a time, so one thread owns the only write
+connection and every other thread hands it work and waits for the result.
+
+Whatever is queued when the writer becomes free runs in a single
+transaction (group commit): fifty concurrent inserts cost one commit
+instead of fifty. Each operation runs inside its own SAVEPOINT, so one that
+fails (a duplicate key, say) is rolled back alone and re-raised in its
+caller while the rest of the batch commits. Callers only get their result
+after the commit, so a returned id is always durable.
+
+A caller whose timeout runs out before the writer has picked up its
+operation cancels it, so the operation never runs and TimeoutError means
+nothing was written. Once the operation is in a transaction the caller
+waits for that transaction's outcome instead of timing out.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+
+class WriterClosedError(Exception):
+    """Raised when work is submitted to a writer that has been closed"""
+
+
+_STOP = object()
+
+
+class SQLiteWriter:
+    """Single writer thread with group commit
+
+    Args:
+        name: label used in log lines and stats
+        connect: callable returning a new sqlite3 connection in autocommit
+            mode (isolation_level=None); called on the writer thread
+        batch_size: maximum operations per transaction
+        max_queue: maximum operations waiting; submitters block beyond it
+        timeout: seconds a caller waits for queue space or for its result
+    """
+
+    def __init__(self, name, connect, batch_size=500, max_queue=10000, timeout=30.0):
+        self.name = name
+        self._connect = connect
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+        self._conn = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        # Held while checking _closed and queueing, so nothing lands behind _STOP
+        self._submit_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {
+            'operations': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'transactions': 0,
+            'max_batch': 0,
+            'commit_seconds': 0.0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name=f'{name}-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def execute(self, operation):
+        """Run operation(conn) on the writer thread and return its result
+
+        Blocks until the transaction holding the operation has committed;
+        exceptions raised by the operation are re-raised here. Raises
+        TimeoutError only for an operation that was cancelled unwritten.
+        """
+        future = self.submit(operation)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise TimeoutError(f"{self.name} writer did not get to the operation within {self.timeout}s")
+            # Already in a transaction - its outcome is on the way
+            return future.result()
+
+    def submit(self, operation):
+        """Queue operation(conn) and return a Future for its result
+
+        Cancelling the Future before the writer picks it up skips the operation.
+        """
+        future = Future()
+        with self._submit_lock:
+            if self._closed.is_set():
+                raise WriterClosedError(f"{self.name} writer is closed")
+            try:
+                self._queue.put((operation, future), timeout=self.timeout)
+            except queue.Full:
+                raise TimeoutError(f"{self.name} writer queue is full ({self._queue.maxsize} operations)")
+        return future
+
+    def depth(self):
+        """Number of operations waiting for the writer"""
+        return self._queue.qsize()
+
+    def stats(self):
+        """Snapshot of writer counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot['depth'] = self.depth()
+        snapshot['capacity'] = self._queue.maxsize
+        return snapshot
+
+    def close(self, timeout=10.0):
+        """Stop accepting work, finish everything queued and close the connection"""
+        with self._submit_lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            self._queue.put((_STOP, None))
+        self._thread.join(timeout)
+
+    def _next_batch(self, block=True):
+        """Take the first operation (waiting for it if block) plus whatever else is queued"""
+        batch = []
+        if block:
+            batch.append(self._queue.get())
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, conn, batch):
+        """Run a batch in one transaction; returns [(future, result, error)]"""
+        outcomes = []
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for operation, future in batch:
+                conn.execute('SAVEPOINT operation')
+                try:
+                    result = operation(conn)
+                    conn.execute('RELEASE operation')
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO operation')
+                    conn.execute('RELEASE operation')
+                    outcomes.append((future, None, e))
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        return outcomes
+
+    def _write(self, batch):
+        # Running futures can't be cancelled any more; drop the cancelled ones
+        size = len(batch)
+        batch = [(operation, future) for operation, future in batch if future.set_running_or_notify_cancel()]
+        if len(batch) < size:
+            with self._lock:
+                self._stats['cancelled'] += size - len(batch)
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        try:
+            if self._conn is None:
+                self._conn = self._connect()
+            outcomes = self._commit(self._conn, batch)
+        except Exception as e:
+            print(f'❌ {self.name} transaction of {len(batch)} operations failed: {e}')
+            outcomes = [(future, None, e) for _, future in batch]
+        elapsed = time.perf_counter() - started
+
+        failed = 0
+        for future, result, error in outcomes:
+            if error is not None:
+                failed += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        with self._lock:
+            self._stats['operations'] += len(batch)
+            self._stats['failed'] += failed
+            self._stats['transactions'] += 1
+            self._stats['max_batch'] = max(self._stats['max_batch'], len(batch))
+            self._stats['commit_seconds'] += elapsed
+
+    def _run(self):
+        stopping = False
+        while True:
+            batch = self._next_batch(block=not stopping)
+            if stopping and not batch:
+                break
+            if any(operation is _STOP for operation, _ in batch):
+                # Work that raced with close() is still written
+                stopping = True
+                batch = [item for item in batch if item[0] is not _STOP]
+            if batch:
+                self._write(batch)
+        if self._conn is not None:
+            self._conn.close()
+
+        # Nothing is queued after _STOP, but never leave a caller waiting
+        while True:
+            try:
+                operation, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if operation is not _STOP and future.set_running_or_notify_cancel():
+                future.set_exception(WriterClosedError(f"{self.name} writer is closed"))
@@ -0,0 +1,470 @@
+"""
+Storage Interface
+The operations every storage backend provides, and the pieces they share
+(payload -> column mapping, validation, field projections).
+
+Two backends implement it:
+- 'postgres' - database_unified.PostgresStorage (production, DATABASE_URL)
+- 'sqlite'   - database_sqlite.SQLiteStorage (embedded, one file, no server)
+
+Pick one with STORAGE_BACKEND and get it with get_storage(); server.py only
+talks to the object it returns. Both return the same shapes (timestamps as
+datetime, list endpoints' timestamps as ISO strings, the same stats keys),
+which test_storage.py checks against each.
+"""
+
+import abc
+import base64
+import json
+import os
+import threading
+from datetime import datetime
+
+# Backend used by get_storage(): 'postgres' or 'sqlite'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'postgres').lower()
+
+# Database file for the sqlite backend
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'analytics.db')
+
+ANALYTICS_INSERT_COLUMNS = (
+    'event, page, timestamp, visitor_id, session_id, '
+    'email, name, country, city, region, ip_address, timezone, '
+    'referrer, user_agent, screen_width, screen_height, language, '
+    'hook_variant, button_name, duration, '
+    'utm_source, utm_medium, utm_campaign, utm_content, referred_by, event_id'
+)
+
+REGISTRATION_INSERT_COLUMNS = (
+    'email, first_name, last_name, phone, '
+    'country, city, region, timezone, ip_address, '
+    'visitor_id, session_id, hook_variant, referrer, '
+    'utm_source, utm_medium, utm_campaign, utm_content, '
+    'referred_by, timestamp'
+)
+
+# Columns callers may ask for with ?fields= (anything else is rejected, so the
+# names are safe to put into the SELECT list)
+ANALYTICS_FIELDS = (
+    'id', 'event', 'page', 'timestamp', 'visitor_id', 'session_id', 'email', 'name',
+    'country', 'city', 'region', 'ip_address', 'timezone', 'referrer', 'user_agent',
+    'screen_width', 'screen_height', 'language', 'hook_variant', 'button_name',
+    'duration', 'utm_source', 'utm_medium', 'utm_campaign', 'utm_content',
+    'referred_by', 'event_id', 'created_at',
+)
+REGISTRATION_FIELDS = (
+    'id', 'email', 'first_name', 'last_name', 'phone', 'country', 'city', 'region',
+    'timezone', 'ip_address', 'visitor_id', 'session_id', 'hook_variant', 'referrer',
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_content', 'referred_by',
+    'timestamp', 'created_at',
+)
+
+# Settings every backend seeds on init_db (existing values are kept)
+DEFAULT_SETTINGS = (
+    ('site_closed', 'false'),
+    ('closed_message', 'Registration is currently closed. Join our waiting list to be notified when we open again!'),
+    ('zoom_link', 'https://zoom.us/j/YOUR_MEETING_ID'),
+    ('community_link', 'https://www.facebook.com/share/g/16Efp4crCe/'),
+    ('questions_form_link', 'https://forms.gle/YOUR_FORM_ID'),
+    ('offer_enabled', 'false'),
+    ('offer_headline', '🎁 Exclusive Bonus Offer - Limited Time!'),
+    ('offer_cta_text', 'Claim Your Bonus Now'),
+    ('offer_cta_link', '#'),
+    ('no_replays_alert', 'true'),
+    ('zoom_surge_mode', 'false'),
+)
+
+# Tables whose change counters (get_data_versions) key the response cache
+VERSIONED_TABLES = ('analytics', 'registrations', 'waiting_list', 'zoom_optins', 'settings')
+
+# Sections of get_analytics_summary()
+SUMMARY_SECTIONS = ('overview', 'ab_test', 'hourly', 'conversion')
+
+# CRM outbox entry kind for ClickFunnels contact syncs
+CRM_CONTACT_KIND = 'clickfunnels_contact'
+
+# Settings each page reads on load, served as one bundle by
+# /api/page-config/<page> instead of one request per key
+EVENT_DASHBOARD_SETTINGS = (
+    'zoom_link', 'community_link', 'questions_form_link',
+    'offer_enabled', 'offer_headline', 'offer_cta_text', 'offer_cta_link',
+    'no_replays_alert',
+)
+PAGE_SETTINGS = {
+    'index': ('site_closed',),
+    'event-dashboard': EVENT_DASHBOARD_SETTINGS,
+    'analytics': ('site_closed', 'zoom_surge_mode') + EVENT_DASHBOARD_SETTINGS,
+}
+
+# Keyset pagination for the list endpoints: newest first, ordered by
+# (timestamp, id) so ties on timestamp never skip or repeat rows. The cursor
+# is an opaque token holding the last row's key.
+LIST_DEFAULT_PAGE_SIZE = 100
+LIST_MAX_PAGE_SIZE = int(os.getenv('LIST_MAX_PAGE_SIZE', '1000'))
+
+def encode_cursor(timestamp, row_id):
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Cursor token -> (timestamp, id); raises ValueError if it wasn't issued by us"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from e
+
+def list_page_size(page_size):
+    """Requested page size, defaulted and capped at LIST_MAX_PAGE_SIZE"""
+    if page_size is None:
+        return LIST_DEFAULT_PAGE_SIZE
+    return max(1, min(int(page_size), LIST_MAX_PAGE_SIZE))
+
+def validate_analytics(data):
+    """Raise ValueError if an analytics event is missing required fields"""
+    if not data.get('event'):
+        raise ValueError(f"Missing required field 'event'. Received data: {list(data.keys())}")
+    if not data.get('timestamp'):
+        raise ValueError(f"Missing required field 'timestamp'. Received data: {list(data.keys())}")
+
+def analytics_values(data):
+    """Map a tracker payload (camelCase keys) to the ANALYTICS_INSERT_COLUMNS order"""
+    return (
+        data.get('event'),
+        data.get('page'),
+        data.get('timestamp'),
+        data.get('visitorId'),
+        data.get('sessionId'),
+        data.get('email'),
+        data.get('name'),
+        data.get('country'),
+        data.get('city'),
+        data.get('region'),
+        data.get('ipAddress'),
+        data.get('timezone'),
+        data.get('referrer'),
+        data.get('userAgent'),
+        data.get('screenWidth'),
+        data.get('screenHeight'),
+        data.get('language'),
+        data.get('hookVariant'),
+        data.get('buttonName'),
+        data.get('duration'),
+        data.get('utmSource'),
+        data.get('utmMedium'),
+        data.get('utmCampaign'),
+        data.get('utmContent'),
+        data.get('referredBy'),
+        data.get('eventId')
+    )
+
+def registration_values(data):
+    """Map a registration payload (camelCase keys) to the REGISTRATION_INSERT_COLUMNS order"""
+    return (
+        data.get('email'),
+        data.get('firstName'),
+        data.get('lastName'),
+        data.get('phone'),
+        data.get('country'),
+        data.get('city'),
+        data.get('region'),
+        data.get('timezone'),
+        data.get('ipAddress'),
+        data.get('visitorId'),
+        data.get('sessionId'),
+        data.get('hookVariant'),
+        data.get('referrer'),
+        data.get('utmSource'),
+        data.get('utmMedium'),
+        data.get('utmCampaign'),
+        data.get('utmContent'),
+        data.get('referredBy'),
+        data.get('timestamp')
+    )
+
+def projection(fields, allowed):
+    """Validate a field list ("a,b" or ['a', 'b']) -> list of columns, or None for all"""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    columns = []
+    for field in fields:
+        field = field.strip()
+        if not field or field in columns:
+            continue
+        if field not in allowed:
+            raise ValueError(f'Unknown field: {field}')
+        columns.append(field)
+    return columns or None
+
+def parse_timestamp(value):
+    """Parse an ISO timestamp the way PostgreSQL casts it to TIMESTAMP (zone ignored)"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+class Storage(abc.ABC):
+    """Operations shared by every backend
+
+    Everything server.py does with its data goes through these methods.
+    Payloads use the tracker's camelCase keys; rows come back as dicts keyed
+    by column name.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def init_db(self):
+        """Create tables, indexes and default settings (idempotent)"""
+
+    # Writes
+
+    @abc.abstractmethod
+    def insert_analytics(self, data):
+        """Insert one event -> id (ValueError if event/timestamp missing)"""
+
+    @abc.abstractmethod
+    def insert_analytics_batch(self, events):
+        """Insert many events, skipping stored (eventId, timestamp) pairs -> rows inserted"""
+
+    @abc.abstractmethod
+    def insert_registration(self, data, crm_contact=None):
+        """Insert a registration -> id, or None for a duplicate (email + timestamp)
+
+        crm_contact is queued in the CRM outbox in the same transaction
+        (not for duplicates).
+        """
+
+    @abc.abstractmethod
+    def insert_waitinglist(self, data, crm_contact=None):
+        """Insert a waiting list entry -> id, or None if the email is already on it"""
+
+    @abc.abstractmethod
+    def insert_zoom_optin(self, data):
+        """Insert a Zoom opt-in -> id"""
+
+    @abc.abstractmethod
+    def insert_zoom_optins_batch(self, optins):
+        """Insert many Zoom opt-ins in one transaction -> rows inserted"""
+
+    @abc.abstractmethod
+    def delete_analytics_event(self, event_id):
+        """Delete an event -> True if it existed"""
+
+    @abc.abstractmethod
+    def delete_registration(self, registration_id):
+        """Delete a registration -> True if it existed"""
+
+    @abc.abstractmethod
+    def reset_analytics(self):
+        """Delete every event and registration (and what is derived from them)
+
+        Returns:
+            {'analytics': rows deleted, 'registrations': rows deleted}
+        """
+
+    # Reads
+
+    @abc.abstractmethod
+    def get_analytics_event_by_id(self, event_id):
+        """One event, or None"""
+
+    @abc.abstractmethod
+    def get_registration_by_id(self, registration_id):
+        """One registration, or None"""
+
+    @abc.abstractmethod
+    def get_all_analytics(self, event_type=None, start_date=None, end_date=None, limit=None, fields=None):
+        """Events newest first, optionally filtered (fields = subset of ANALYTICS_FIELDS)"""
+
+    @abc.abstractmethod
+    def get_all_registrations(self, limit=None, fields=None):
+        """Registrations newest first (fields = subset of REGISTRATION_FIELDS)"""
+
+    @abc.abstractmethod
+    def get_all_waitinglist(self):
+        """Waiting list entries newest first, timestamps as ISO strings"""
+
+    @abc.abstractmethod
+    def get_all_zoom_optins(self):
+        """Zoom opt-ins newest first, timestamps as ISO strings"""
+
+    @abc.abstractmethod
+    def get_waitinglist_count(self):
+        """Number of waiting list entries"""
+
+    @abc.abstractmethod
+    def get_analytics_stats(self, approximate=None):
+        """{events_by_type, total_events, total_registrations, unique_visitors, unique_visitors_approximate}"""
+
+    @abc.abstractmethod
+    def get_referral_stats(self, registration_id=None):
+        """Referrals of one registrant, or overall top referrers"""
+
+    @abc.abstractmethod
+    def get_analytics_summary(self, start_date=None, end_date=None, sections=None, tz_offset=0, bucket='day'):
+        """Dashboard aggregates, one key per requested SUMMARY_SECTIONS entry"""
+
+    @abc.abstractmethod
+    def estimate_unique_visitors(self, start_date=None, end_date=None, page=None, hook_variant=None):
+        """Unique visitors for whole UTC days, optionally one page / variant"""
+
+    # Keyset pages: {'items': [...], 'next_cursor': token or None}, newest
+    # first; the token comes from encode_cursor()
+
+    @abc.abstractmethod
+    def get_analytics_page(self, event_type=None, start_date=None, end_date=None, cursor=None, page_size=None,
+                           fields=None):
+        """One page of events"""
+
+    @abc.abstractmethod
+    def get_registrations_page(self, cursor=None, page_size=None, fields=None):
+        """One page of registrations"""
+
+    @abc.abstractmethod
+    def get_waitinglist_page(self, cursor=None, page_size=None):
+        """One page of waiting list entries, timestamps as ISO strings"""
+
+    @abc.abstractmethod
+    def get_zoom_optins_page(self, cursor=None, page_size=None):
+        """One page of Zoom opt-ins, timestamps as ISO strings"""
+
+    # Streaming exports: the same rows as get_all_*, yielded one at a time
+    # without holding the whole table in memory
+
+    @abc.abstractmethod
+    def stream_all_analytics(self, event_type=None, start_date=None, end_date=None, limit=None, fields=None):
+        """Like get_all_analytics, as a generator"""
+
+    @abc.abstractmethod
+    def stream_all_registrations(self, fields=None):
+        """Like get_all_registrations, as a generator"""
+
+    @abc.abstractmethod
+    def stream_all_waitinglist(self):
+        """Like get_all_waitinglist, as a generator"""
+
+    @abc.abstractmethod
+    def stream_all_zoom_optins(self):
+        """Like get_all_zoom_optins, as a generator"""
+
+    # Hook A/B test (ab_analysis.HookABTest)
+
+    @abc.abstractmethod
+    def stream_ab_test_chunks(self, watermarks=None, chunk_size=50000):
+        """Yield (table, kind, variant_names, rows) chunks newer than the per-table id watermarks"""
+
+    @abc.abstractmethod
+    def get_ab_test_totals(self):
+        """{'visits': ..., 'registrations': ...} hook-variant rows stored"""
+
+    # CRM outbox (crm_outbox.OutboxWorkerPool)
+
+    @abc.abstractmethod
+    def enqueue_outbox(self, kind, payload):
+        """Queue a delivery on its own -> outbox id"""
+
+    @abc.abstractmethod
+    def claim_outbox_batch(self, limit=10, lease_seconds=300):
+        """Lease up to `limit` due entries -> [{id, kind, payload, attempts}]"""
+
+    @abc.abstractmethod
+    def complete_outbox(self, entry_id):
+        """Mark an entry as delivered"""
+
+    @abc.abstractmethod
+    def fail_outbox(self, entry_id, error, retry_in=None):
+        """Retry an entry after `retry_in` seconds, or dead-letter it if None"""
+
+    @abc.abstractmethod
+    def get_outbox_stats(self):
+        """{pending, delivered, dead, oldest_pending_age_seconds}"""
+
+    @abc.abstractmethod
+    def get_dead_outbox_entries(self, limit=100):
+        """Most recent dead-lettered entries"""
+
+    @abc.abstractmethod
+    def retry_dead_outbox(self, entry_id=None):
+        """Requeue dead-lettered entries (one, or all) -> number requeued"""
+
+    # Backups
+
+    @abc.abstractmethod
+    def backup_increment(self):
+        """Append rows added since the last backup to the JSONL segments -> rows per table"""
+
+    @abc.abstractmethod
+    def get_backup_status(self):
+        """Backup worker counters, directory and per-table watermarks"""
+
+    # Caching
+
+    @abc.abstractmethod
+    def get_data_versions(self, tables=VERSIONED_TABLES):
+        """{table: change counter}; any write to a table moves its counter"""
+
+    @abc.abstractmethod
+    def warm_settings_cache(self, timeout=5.0):
+        """Load settings ahead of the first request -> True once they are in memory"""
+
+    @abc.abstractmethod
+    def get_settings_cache_stats(self):
+        """Settings cache counters, or None if this backend reads settings directly"""
+
+    # Settings
+
+    @abc.abstractmethod
+    def get_setting(self, key):
+        """Value of one setting, or None"""
+
+    @abc.abstractmethod
+    def set_setting(self, key, value):
+        """Set one setting"""
+
+    @abc.abstractmethod
+    def set_settings(self, values):
+        """Set several settings in one transaction"""
+
+    @abc.abstractmethod
+    def get_all_settings(self):
+        """{key: {'value': ..., 'updated_at': ISO string}}"""
+
+    @abc.abstractmethod
+    def get_page_config(self, page):
+        """{key: value} for every setting in PAGE_SETTINGS[page], or None for an unknown page"""
+
+    # Connections
+
+    @abc.abstractmethod
+    def get_pool_stats(self):
+        """Connection pool counters, or None if this backend has no pool"""
+
+    @abc.abstractmethod
+    def warm_pool(self, count):
+        """Open connections ahead of a burst -> number opened"""
+
+
+_storages = {}
+_storages_lock = threading.Lock()
+
+def get_storage(backend=None):
+    """Get the storage backend (default: STORAGE_BACKEND), created once per process"""
+    backend = (backend or STORAGE_BACKEND).lower()
+    with _storages_lock:
+        storage = _storages.get(backend)
+        if storage is None:
+            if backend == 'postgres':
+                from database_unified import PostgresStorage
+                storage = PostgresStorage()
+            elif backend == 'sqlite':
+                from database_sqlite import SQLiteStorage
+                storage = SQLiteStorage(SQLITE_PATH)
+            else:
+                raise ValueError(f"Unknown storage backend: {backend}")
+            _storages[backend] = storage
+        return storage
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test the streaming hook A/B analysis (no database needed)
+Run: python3 test_ab_analysis.py
+"""
+
+import io
+import json
+import math
+
+import ab_analysis
+from ab_analysis import HookABTest, REGISTRATION, VISIT, stable_hash, two_proportion_z_test
+
+
+def _records(visitors, registrants, variant):
+    """page_visit events for `visitors` ids, registrations for the first `registrants`"""
+    records = [{'event': 'page_visit', 'hook_variant': variant, 'visitor_id': f'{variant}-{i}'}
+               for i in range(visitors)]
+    records += [{'hookVariant': variant, 'email': f'{variant}-{i}@example.com'}
+                for i in range(registrants)]
+    return records
+
+
+def test_z_test():
+    """Matches the textbook two-proportion test"""
+    result = two_proportion_z_test(100, 1000, 150, 1000)
+    assert math.isclose(result['difference'], 0.05)
+    assert math.isclose(result['z'], 3.3806, abs_tol=1e-3)
+    assert result['p_value'] < 0.001
+    low, high = result['ci_95']
+    assert low < 0.05 < high and low > 0
+    assert two_proportion_z_test(0, 0, 5, 10)['p_value'] == 1.0
+    print("   ✅ Two-proportion z-test")
+
+
+def test_duplicates_counted_once():
+    """Visits count every event; visitors and registrants are distinct"""
+    test = HookABTest()
+    records = _records(10, 4, 'A') * 3
+    test.add_records(records, chunk_size=7)
+    stats = test.results()['variants']['A']
+    assert stats['visits'] == 30
+    assert stats['visitors'] == 10
+    assert stats['registrations'] == 4
+    assert stats['conversion_rate'] == 0.4
+    print("   ✅ Repeat visitors and registrants counted once")
+
+
+def test_normalize_record():
+    """camelCase and snake_case backups; page visits with an email also register"""
+    assert ab_analysis._normalize_record({'event': 'page_visit', 'hookVariant': 'B', 'sessionId': 's1'}) == [
+        (VISIT, 'B', 's1')]
+    assert ab_analysis._normalize_record({'hook_variant': 'A', 'email': 'x@example.com'}) == [
+        (REGISTRATION, 'A', 'x@example.com')]
+    assert ab_analysis._normalize_record(
+        {'event': 'page_visit', 'hook_variant': 'C', 'visitor_id': 'v', 'email': 'y@example.com'}) == [
+        (VISIT, 'C', 'v'), (REGISTRATION, 'C', 'y@example.com')]
+    assert ab_analysis._normalize_record({'event': 'click', 'hook_variant': 'A', 'visitor_id': 'v'}) == []
+    assert ab_analysis._normalize_record({'event': 'page_visit', 'visitor_id': 'v'}) == []
+    print("   ✅ Backup records normalized")
+
+
+def test_coded_chunks_match_named_chunks():
+    """Database-style (code, key) chunks count the same as variant names"""
+    names = ['A', 'B', 'C']
+    codes = [i % 3 for i in range(900)]
+    keys = [i % 250 for i in range(900)]
+
+    named = HookABTest()
+    named.add_chunk(VISIT, [names[c] for c in codes], keys)
+    coded = HookABTest()
+    coded.add_coded_chunk(VISIT, names, codes, keys)
+    assert named.results()['variants'] == coded.results()['variants']
+    print("   ✅ Coded and named chunks agree")
+
+
+def test_consume_advances_watermarks():
+    """Incremental updates only add the new rows and remember the last id"""
+    names = ['A', 'B']
+    test = HookABTest()
+    test.consume([
+        ('analytics', VISIT, names, [(0, 1, 10), (1, 2, 11), (0, 3, 12)]),
+        ('registrations', REGISTRATION, names, [(0, 1, 5)]),
+        ('analytics', VISIT, names, []),
+    ])
+    assert test.watermarks == {'analytics': 12, 'registrations': 5}
+    test.consume([('analytics', VISIT, names, [(1, 4, 20), (1, 2, 21)])])
+    assert test.watermarks['analytics'] == 21
+    assert test.totals() == {'visits': 5, 'registrations': 1}
+    variants = test.results()['variants']
+    assert variants['A']['visitors'] == 2
+    assert variants['B']['visitors'] == 2  # key 2 seen twice
+    print("   ✅ Watermarks advance across consume() calls")
+
+
+def _clear_difference():
+    test = HookABTest()
+    test.add_records(_records(2000, 100, 'A') + _records(2000, 200, 'B'))
+    return test.results()
+
+
+def test_winner_declared():
+    """A clearly better variant is significant and wins"""
+    results = _clear_difference()
+    assert results['control'] == 'A'
+    comparison = results['comparisons']['B']
+    assert comparison['significant']
+    assert comparison['prob_beats_control'] > 0.99
+    assert results['winner'] == 'B'
+    assert math.isclose(sum(results['prob_best'].values()), 1.0)
+    print(f"   ✅ Winner B (p = {comparison['p_value']:.2g}, engine {results['engine']})")
+
+
+def test_no_winner_on_equal_rates():
+    test = HookABTest()
+    test.add_records(_records(1000, 100, 'A') + _records(1000, 100, 'B'))
+    results = test.results()
+    assert not results['comparisons']['B']['significant']
+    assert results['winner'] is None
+    print("   ✅ No winner on equal rates")
+
+
+def test_pure_python_fallback():
+    """Without NumPy the counts and tests are identical"""
+    if ab_analysis.np is None:
+        print("   ⚠️  NumPy not installed - fallback is the only engine")
+        return
+    with_numpy = _clear_difference()
+    saved, ab_analysis.np = ab_analysis.np, None
+    try:
+        without_numpy = _clear_difference()
+    finally:
+        ab_analysis.np = saved
+    assert without_numpy['engine'] == 'python'
+    assert with_numpy['variants'] == without_numpy['variants']
+    assert with_numpy['comparisons']['B']['z'] == without_numpy['comparisons']['B']['z']
+    assert with_numpy['winner'] == without_numpy['winner']
+    print("   ✅ NumPy and pure Python engines agree")
+
+
+def test_stable_hash():
+    assert stable_hash('visitor-1') == stable_hash('visitor-1')
+    assert stable_hash('visitor-1') != stable_hash('visitor-2')
+    assert -(1 << 63) <= stable_hash('x') < (1 << 63)
+    print("   ✅ Stable signed 64-bit hash")
+
+
+def test_json_array_streamed():
+    """JSON array backups decode element by element, across chunk boundaries"""
+    records = _records(50, 5, 'A') + [{'note': 'brackets ] and, commas [ in "strings"'}]
+    text = json.dumps(records, indent=2)
+    for chunk_size in (1, 7, 64, 1 << 16):
+        assert list(ab_analysis.iter_json_array(io.StringIO(text), chunk_size)) == records
+    assert list(ab_analysis.iter_json_array(io.StringIO(' [ ] '))) == []
+    for bad in ('{"event": "x"}', '[{"a": 1}, {"b": ', ''):
+        try:
+            list(ab_analysis.iter_json_array(io.StringIO(bad), 4))
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    print("   ✅ JSON arrays streamed")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing hook A/B analysis")
+    print("=" * 60)
+    test_z_test()
+    test_duplicates_counted_once()
+    test_normalize_record()
+    test_coded_chunks_match_named_chunks()
+    test_consume_advances_watermarks()
+    test_winner_declared()
+    test_no_winner_on_equal_rates()
+    test_pure_python_fallback()
+    test_stable_hash()
+    test_json_array_streamed()
+    print("\n✅ All A/B analysis tests passed!")
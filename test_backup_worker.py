@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test the background backup worker without a database server
+Run: python3 test_backup_worker.py
+"""
+
+import threading
+import time
+
+from backup_worker import BackupWorker
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_trigger_returns_immediately():
+    """trigger() must not wait for the job"""
+    gate = threading.Event()
+    runs = []
+
+    def job():
+        gate.wait(2)
+        runs.append(1)
+
+    worker = BackupWorker('test', job, interval=None)
+    started = time.monotonic()
+    worker.trigger()
+    assert time.monotonic() - started < 0.1
+
+    gate.set()
+    assert wait_for(lambda: runs)
+    worker.close()
+    print("   ✅ trigger() does not block")
+
+
+def test_triggers_are_coalesced():
+    """Triggers during a run collapse into a single follow-up run"""
+    gate = threading.Event()
+    runs = []
+
+    def job():
+        runs.append(1)
+        gate.wait(2)
+
+    worker = BackupWorker('test', job, interval=None)
+    worker.trigger()
+    assert wait_for(lambda: runs)
+    for _ in range(10):
+        worker.trigger()
+    gate.set()
+
+    assert wait_for(lambda: len(runs) == 2)
+    time.sleep(0.1)
+    assert len(runs) == 2
+    worker._stop.set()  # skip the final run on close
+    worker._wake.set()
+    worker._thread.join(2)
+    print("   ✅ Triggers coalesced")
+
+
+def test_runs_on_interval():
+    """Without triggers the job still runs every interval"""
+    runs = []
+    worker = BackupWorker('test', lambda: runs.append(1), interval=0.05)
+    assert wait_for(lambda: len(runs) >= 2)
+    worker.close()
+    print("   ✅ Scheduled runs happen")
+
+
+def test_failure_is_recorded():
+    """A failing job is counted and the worker keeps running"""
+    calls = []
+
+    def job():
+        calls.append(1)
+        if len(calls) == 1:
+            raise IOError('disk full')
+        return {'analytics': 3}
+
+    worker = BackupWorker('test', job, interval=None)
+    worker.trigger()
+    assert wait_for(lambda: worker.stats()['failures'] == 1)
+    assert worker.stats()['last_error'] == 'disk full'
+
+    worker.trigger()
+    assert wait_for(lambda: worker.stats()['runs'] == 1)
+    assert worker.stats()['last_result'] == {'analytics': 3}
+    assert worker.stats()['last_error'] is None
+    worker.close()
+    print("   ✅ Failures recorded, worker survives")
+
+
+def test_close_runs_final_pass():
+    """close() exports once more so nothing is left behind at shutdown"""
+    runs = []
+    worker = BackupWorker('test', lambda: runs.append(1), interval=None)
+    worker.close()
+    assert runs == [1]
+    print("   ✅ Final run on shutdown")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing Backup Worker")
+    print("=" * 60)
+    test_trigger_returns_immediately()
+    test_triggers_are_coalesced()
+    test_runs_on_interval()
+    test_failure_is_recorded()
+    test_close_runs_final_pass()
+    print("\n✅ All backup worker tests passed!")
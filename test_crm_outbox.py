@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test the CRM outbox workers with an in-memory store (no database or CRM needed)
+Run: python3 test_crm_outbox.py
+"""
+
+import threading
+import time
+
+from crm_outbox import OutboxWorkerPool, DeliveryError, backoff_delay
+
+
+class FakeStore:
+    """Mimics claim/complete/fail from database_unified, including SKIP LOCKED claims"""
+
+    def __init__(self, payloads, kind='contact'):
+        self.lock = threading.Lock()
+        self.entries = {
+            i: {'id': i, 'kind': kind, 'payload': p, 'attempts': 0, 'status': 'pending',
+                'due': 0.0, 'error': None}
+            for i, p in enumerate(payloads, 1)
+        }
+
+    def claim_outbox_batch(self, limit, lease_seconds):
+        now = time.monotonic()
+        with self.lock:
+            due = [e for e in self.entries.values() if e['status'] == 'pending' and e['due'] <= now][:limit]
+            for entry in due:
+                entry['attempts'] += 1
+                entry['due'] = now + lease_seconds
+            return [dict(e) for e in due]
+
+    def complete_outbox(self, entry_id):
+        with self.lock:
+            self.entries[entry_id]['status'] = 'delivered'
+
+    def fail_outbox(self, entry_id, error, retry_in):
+        with self.lock:
+            entry = self.entries[entry_id]
+            entry['error'] = error
+            if retry_in is None:
+                entry['status'] = 'dead'
+            else:
+                entry['due'] = time.monotonic() + retry_in
+
+
+def wait_until(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_delivers_each_entry_once():
+    """Several workers share the queue without delivering anything twice"""
+    store = FakeStore([f'user{i}@example.com' for i in range(50)])
+    delivered = []
+    lock = threading.Lock()
+
+    def handler(payload):
+        with lock:
+            delivered.append(payload)
+
+    pool = OutboxWorkerPool('test', store, {'contact': handler}, workers=4, batch_size=5, poll_interval=0.01)
+    assert wait_until(lambda: len(delivered) == 50)
+    pool.close()
+
+    assert sorted(delivered) == sorted(f'user{i}@example.com' for i in range(50))
+    assert all(e['status'] == 'delivered' for e in store.entries.values())
+    print("   ✅ Every entry delivered exactly once")
+
+
+def test_retries_then_succeeds():
+    """A transient failure is retried after a backoff"""
+    store = FakeStore(['a@example.com'])
+    attempts = []
+
+    def flaky(payload):
+        attempts.append(payload)
+        if len(attempts) < 3:
+            raise DeliveryError('ClickFunnels 503')
+
+    pool = OutboxWorkerPool('test', store, {'contact': flaky}, workers=1, poll_interval=0.01,
+                            base_delay=0.01, max_delay=0.05)
+    assert wait_until(lambda: store.entries[1]['status'] == 'delivered')
+    pool.close()
+
+    assert len(attempts) == 3
+    assert pool.stats()['retried'] == 2
+    print("   ✅ Transient failures retried")
+
+
+def test_dead_letters_after_max_attempts():
+    """An entry that keeps failing ends up dead-lettered"""
+    store = FakeStore(['a@example.com'])
+
+    def always_down(payload):
+        raise DeliveryError('timeout')
+
+    pool = OutboxWorkerPool('test', store, {'contact': always_down}, workers=1, poll_interval=0.01,
+                            max_attempts=3, base_delay=0.01, max_delay=0.01)
+    assert wait_until(lambda: store.entries[1]['status'] == 'dead')
+    pool.close()
+
+    assert store.entries[1]['attempts'] == 3
+    assert store.entries[1]['error'] == 'timeout'
+    print("   ✅ Dead-lettered after max attempts")
+
+
+def test_non_retryable_error_dead_letters_immediately():
+    """A 4xx-style error is not retried"""
+    store = FakeStore(['not-an-email'])
+
+    def rejects(payload):
+        raise DeliveryError('ClickFunnels 422', retryable=False)
+
+    pool = OutboxWorkerPool('test', store, {'contact': rejects}, workers=1, poll_interval=0.01)
+    assert wait_until(lambda: store.entries[1]['status'] == 'dead')
+    pool.close()
+
+    assert store.entries[1]['attempts'] == 1
+    print("   ✅ Non-retryable errors dead-lettered at once")
+
+
+def test_backoff_grows_and_caps():
+    """Backoff doubles per attempt and never exceeds max_delay (+jitter)"""
+    assert 24 <= backoff_delay(1, 30, 3600) <= 36
+    assert 96 <= backoff_delay(3, 30, 3600) <= 144
+    assert backoff_delay(20, 30, 3600) <= 3600 * 1.2
+    print("   ✅ Exponential backoff")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing CRM Outbox Workers")
+    print("=" * 60)
+    test_delivers_each_entry_once()
+    test_retries_then_succeeds()
+    test_dead_letters_after_max_attempts()
+    test_non_retryable_error_dead_letters_immediately()
+    test_backoff_grows_and_caps()
+    print("\n✅ All CRM outbox tests passed!")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test the PostgreSQL connection pool without a database server
+Uses fake connections so it can run anywhere: python3 test_db_pool.py
+"""
+
+import threading
+import time
+
+from db_pool import ConnectionPool, PoolExhaustedError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise Exception("server closed the connection unexpectedly")
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    opened = 0
+
+    def __init__(self):
+        FakeConnection.opened += 1
+        self.closed = 0
+        self.broken = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def test_reuses_connections():
+    """Sequential checkouts should share one warm connection"""
+    pool = ConnectionPool(FakeConnection, minconn=1, maxconn=5)
+    first = pool.getconn()
+    pool.putconn(first)
+    second = pool.getconn()
+    pool.putconn(second)
+
+    assert first is second
+    assert pool.stats()['connections_created'] == 1
+    assert pool.stats()['checkouts'] == 2
+    print("   ✅ Connections are reused")
+
+
+def test_exhaustion_raises_and_is_counted():
+    """Checkout beyond maxconn should time out and record exhaustion"""
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=2, timeout=0.05)
+    held = [pool.getconn(), pool.getconn()]
+
+    try:
+        pool.getconn()
+        assert False, "expected PoolExhaustedError"
+    except PoolExhaustedError:
+        pass
+
+    stats = pool.stats()
+    assert stats['exhausted'] == 1
+    assert stats['waits'] == 1
+    assert stats['in_use'] == 2
+    for conn in held:
+        pool.putconn(conn)
+    print("   ✅ Exhaustion is reported")
+
+
+def test_waiter_gets_released_connection():
+    """A blocked checkout should wake up when another thread returns a connection"""
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=1, timeout=2)
+    held = pool.getconn()
+    result = {}
+
+    def worker():
+        result['conn'] = pool.getconn()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(0.05)
+    pool.putconn(held)
+    thread.join(timeout=2)
+
+    assert result.get('conn') is held
+    print("   ✅ Waiting checkout is woken up")
+
+
+def test_health_check_replaces_dead_connection():
+    """Broken idle connections should be discarded on checkout"""
+    pool = ConnectionPool(FakeConnection, minconn=1, maxconn=2, max_idle=0)
+    conn = pool.getconn()
+    conn.broken = True
+    pool.putconn(conn)
+
+    replacement = pool.getconn()
+    assert replacement is not conn
+    assert conn.closed
+    assert pool.stats()['health_check_failures'] == 1
+    assert pool.stats()['open'] == 1
+    print("   ✅ Dead connection replaced")
+
+
+def test_max_lifetime_recycles():
+    """Connections older than max_lifetime should be closed and reopened"""
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=2, max_lifetime=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    replacement = pool.getconn()
+    assert replacement is not conn
+    assert pool.stats()['connections_recycled'] == 1
+    print("   ✅ Old connection recycled")
+
+
+def test_concurrent_checkouts_never_exceed_max():
+    """Many threads hammering the pool must stay within maxconn"""
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=4, timeout=5)
+    peak = {'value': 0}
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(50):
+            conn = pool.getconn()
+            with lock:
+                peak['value'] = max(peak['value'], pool.stats()['in_use'])
+            pool.putconn(conn)
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.stats()
+    assert peak['value'] <= 4
+    assert stats['open'] <= 4
+    assert stats['in_use'] == 0
+    assert stats['checkouts'] == 16 * 50
+    print("   ✅ Pool stays within maxconn under concurrency")
+
+
+def test_warm_opens_up_to_count():
+    """warm() should pre-open idle connections, never past maxconn"""
+    pool = ConnectionPool(FakeConnection, minconn=1, maxconn=4)
+    held = pool.getconn()
+
+    assert pool.warm(3) == 2
+    assert pool.warm(3) == 0
+    assert pool.warm(10) == 1
+    stats = pool.stats()
+    assert stats['open'] == 4
+    assert stats['idle'] == 3
+    assert stats['connections_created'] == 4
+
+    pool.putconn(held)
+    print("   ✅ Pool warmed ahead of a burst")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing Connection Pool")
+    print("=" * 60)
+    test_reuses_connections()
+    test_exhaustion_raises_and_is_counted()
+    test_waiter_gets_released_connection()
+    test_health_check_replaces_dead_connection()
+    test_max_lifetime_recycles()
+    test_concurrent_checkouts_never_exceed_max()
+    test_warm_opens_up_to_count()
+    print("\n✅ All pool tests passed!")
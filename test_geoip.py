@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test the offline IP geolocation engine against the fixture dataset
+Run: python3 test_geoip.py
+"""
+
+import ipaddress
+import os
+import tempfile
+import time
+
+from geoip import GeoIPDatabase, load_geoip_database
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'geoip-fixture.csv')
+
+
+def test_ipv4_lookup():
+    """Addresses inside a range resolve, including both endpoints"""
+    db = GeoIPDatabase.load(FIXTURE)
+    assert db.lookup('8.8.8.8')['city'] == 'Mountain View'
+    assert db.lookup('81.2.69.0')['country_name'] == 'United Kingdom'
+    assert db.lookup('81.2.69.255')['country'] == 'GB'
+    assert db.lookup('41.20.1.1')['timezone'] == 'Africa/Johannesburg'
+    assert db.lookup('8.8.8.8')['source'] == 'local'
+    print("   ✅ IPv4 lookups")
+
+
+def test_integer_ranges():
+    """Rows written as integers (IP2Location style) load like dotted ones"""
+    db = GeoIPDatabase.load(FIXTURE)
+    assert db.lookup('74.125.200.1')['country'] == 'US'
+    print("   ✅ Integer range rows")
+
+
+def test_ipv6_lookup():
+    """IPv6 ranges and IPv4-mapped IPv6 addresses resolve"""
+    db = GeoIPDatabase.load(FIXTURE)
+    assert db.lookup('2001:4860:4860::8888')['country'] == 'US'
+    assert db.lookup('2a00:1450:4009:81c::200e')['city'] == 'Dublin'
+    assert db.lookup('::ffff:1.0.0.1')['country'] == 'AU'
+    print("   ✅ IPv6 lookups")
+
+
+def test_misses():
+    """Gaps, private addresses and garbage return None"""
+    db = GeoIPDatabase.load(FIXTURE)
+    assert db.lookup('8.8.9.0') is None
+    assert db.lookup('192.168.1.10') is None
+    assert db.lookup('2001:db8::1') is None
+    assert db.lookup('not-an-ip') is None
+    assert db.lookup(None) is None
+    print("   ✅ Uncovered addresses return None")
+
+
+def test_shared_locations_are_stored_once():
+    """Ranges with the same location share one entry"""
+    db = GeoIPDatabase.load(FIXTURE)
+    stats = db.stats()
+    assert stats['ipv4_ranges'] == 6
+    assert stats['ipv6_ranges'] == 2
+    assert stats['locations'] == 6
+    print("   ✅ Locations deduplicated")
+
+
+def test_bad_row_is_reported():
+    """A malformed dataset fails loudly with the line number"""
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        f.write('start,end,country_code,country_name,region,city,timezone\n')
+        f.write('10.0.0.9,10.0.0.1,US,United States,,,\n')
+        path = f.name
+    try:
+        GeoIPDatabase.load(path)
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert ':2:' in str(e)
+    finally:
+        os.unlink(path)
+    assert load_geoip_database('/nonexistent/geoip.csv') is None
+    print("   ✅ Bad rows and missing files handled")
+
+
+def test_ipv6_integer_export():
+    """IP2Location IPv6 integer files start at 0 and list IPv4 space as ::ffff:a.b.c.d"""
+    google = int(ipaddress.ip_address('2001:4860::'))
+    mapped = int(ipaddress.ip_address('::ffff:8.8.8.0'))
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        f.write('start,end,country_code,country_name,region,city,timezone\n')
+        f.write(f'0,{mapped - 1},-,-,-,-,-\n')
+        f.write(f'{mapped},{mapped + 255},US,United States,California,Mountain View,America/Los_Angeles\n')
+        f.write(f'{google},{google + 2 ** 96 - 1},US,United States,California,Mountain View,America/Los_Angeles\n')
+        path = f.name
+    try:
+        db = load_geoip_database(path)
+    finally:
+        os.unlink(path)
+
+    assert db is not None
+    assert db.stats() == {'ipv4_ranges': 1, 'ipv6_ranges': 2, 'locations': 2}
+    assert db.lookup('8.8.8.8')['city'] == 'Mountain View'
+    assert db.lookup('::ffff:8.8.8.8')['city'] == 'Mountain View'
+    assert db.lookup('2001:4860:4860::8888')['country'] == 'US'
+    assert db.lookup('::1')['country'] == '-'
+    assert db.lookup('8.8.9.1') is None
+    print("   ✅ IPv6 integer export with a range starting at 0")
+
+
+def test_lookup_speed():
+    """Lookups in a large table stay in the microsecond range"""
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        f.write('start,end,country_code,country_name,region,city,timezone\n')
+        for i in range(100000):
+            start = 16777216 + i * 256
+            f.write(f'{start},{start + 255},C{i % 200},Country {i % 200},,,\n')
+        path = f.name
+    try:
+        db = GeoIPDatabase.load(path)
+    finally:
+        os.unlink(path)
+
+    started = time.perf_counter()
+    for i in range(10000):
+        db.lookup(f'{1 + i % 90}.{i % 256}.{(i * 7) % 256}.1')
+    per_lookup = (time.perf_counter() - started) / 10000
+    assert per_lookup < 0.0005
+    print(f"   ✅ {per_lookup * 1e6:.1f}µs per lookup over 100k ranges")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing Offline GeoIP")
+    print("=" * 60)
+    test_ipv4_lookup()
+    test_integer_ranges()
+    test_ipv6_lookup()
+    test_misses()
+    test_shared_locations_are_stored_once()
+    test_bad_row_is_reported()
+    test_ipv6_integer_export()
+    test_lookup_speed()
+    print("\n✅ All GeoIP tests passed!")
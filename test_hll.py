@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test the HyperLogLog estimator and in-memory sketch (no database needed)
+Run: python3 test_hll.py
+"""
+
+from hll import HyperLogLog, estimate, register_for
+
+
+def test_register_layout():
+    """Low bits pick the register, leading zeros of the rest give the rank"""
+    assert register_for(0, 10) == (0, 55)
+    assert register_for(1 << 63, 10) == (0, 1)
+    assert register_for(-1, 10) == (1023, 1)  # signed bigint from PostgreSQL
+    assert register_for((1 << 62) | 5, 10) == (5, 2)
+    print("   ✅ Register index and rank")
+
+
+def test_accuracy():
+    """Estimates stay within a few standard errors across cardinalities"""
+    for n in (10, 1000, 50000):
+        sketch = HyperLogLog()
+        for i in range(n):
+            sketch.add(f'visitor-{i}')
+        error = abs(sketch.count() - n) / n
+        assert error < 0.1, (n, sketch.count())
+        print(f"   ✅ {n} distinct -> {sketch.count()} ({error:.1%} off)")
+
+
+def test_duplicates_do_not_count():
+    """Adding the same values again doesn't change the estimate"""
+    sketch = HyperLogLog()
+    for _ in range(3):
+        for i in range(500):
+            sketch.add(i)
+    once = HyperLogLog()
+    for i in range(500):
+        once.add(i)
+    assert sketch.registers == once.registers
+    print("   ✅ Repeated values ignored")
+
+
+def test_merge_is_union():
+    """Merging per-day sketches estimates the union, overlap counted once"""
+    monday, tuesday, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(0, 6000):
+        monday.add(i)
+        both.add(i)
+    for i in range(4000, 10000):
+        tuesday.add(i)
+        both.add(i)
+    merged = HyperLogLog().merge(monday).merge(tuesday)
+    assert merged.registers == both.registers
+    assert abs(merged.count() - 10000) < 1000
+    print(f"   ✅ Merged sketches = sketch of the union ({merged.count()})")
+
+
+def test_empty_and_precision_checks():
+    assert estimate({}) == 0
+    try:
+        HyperLogLog(precision=20)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    try:
+        HyperLogLog(precision=10).merge(HyperLogLog(precision=12))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("   ✅ Empty sketch and precision checks")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing HyperLogLog")
+    print("=" * 60)
+    test_register_layout()
+    test_accuracy()
+    test_duplicates_do_not_count()
+    test_merge_is_union()
+    test_empty_and_precision_checks()
+    print("\n✅ All HyperLogLog tests passed!")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test the shared outbound HTTP client against a local throwaway server
+Run: python3 test_http_client.py
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_client import HttpClient, CircuitBreaker, CircuitOpenError
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    status = 200
+    delay = 0.0
+    connections = set()
+
+    def do_GET(self):
+        _Handler.connections.add(self.client_address)
+        time.sleep(_Handler.delay)
+        body = b'{"ok": true}'
+        self.send_response(_Handler.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # the timeout test hangs up on purpose
+
+
+def start_server():
+    _Handler.status = 200
+    _Handler.delay = 0.0
+    _Handler.connections = set()
+    server = _QuietServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/'
+
+
+def test_connections_are_reused():
+    """Sequential calls to one host share a keep-alive connection"""
+    server, url = start_server()
+    client = HttpClient()
+    try:
+        for _ in range(5):
+            assert client.get(url).json() == {'ok': True}
+        assert len(_Handler.connections) == 1
+        stats = client.stats()[url.rstrip('/')]
+        assert stats['requests'] == 5
+        assert stats['errors'] == 0
+        assert stats['p50_ms'] is not None
+    finally:
+        client.close()
+        server.shutdown()
+    print("   ✅ Keep-alive connection reused")
+
+
+def test_default_timeout():
+    """A slow upstream raises instead of hanging"""
+    server, url = start_server()
+    _Handler.delay = 0.5
+    client = HttpClient(timeout=(1, 0.1))
+    try:
+        client.get(url)
+        assert False, "expected a timeout"
+    except requests.Timeout:
+        pass
+    finally:
+        client.close()
+        server.shutdown()
+    print("   ✅ Read timeout enforced")
+
+
+def test_breaker_opens_and_recovers():
+    """5xx responses open the circuit; a successful trial closes it"""
+    server, url = start_server()
+    _Handler.status = 503
+    client = HttpClient(failure_threshold=3, reset_timeout=0.2)
+    try:
+        for _ in range(3):
+            assert client.get(url).status_code == 503
+        try:
+            client.get(url)
+            assert False, "expected CircuitOpenError"
+        except CircuitOpenError:
+            pass
+        stats = client.stats()[url.rstrip('/')]
+        assert stats['circuit'] == 'open'
+        assert stats['rejected'] == 1
+        assert stats['requests'] == 3
+
+        _Handler.status = 200
+        time.sleep(0.25)
+        assert client.get(url).status_code == 200
+        assert client.stats()[url.rstrip('/')]['circuit'] == 'closed'
+    finally:
+        client.close()
+        server.shutdown()
+    print("   ✅ Circuit opens on failures and closes after a good trial")
+
+
+def test_half_open_allows_one_trial():
+    """Only one caller probes a half-open circuit; a failed trial re-opens it"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.times_opened == 2
+    print("   ✅ Half-open circuit admits a single trial")
+
+
+def test_unexpected_error_ends_trial():
+    """An exception that isn't a RequestException still settles a half-open trial"""
+    server, url = start_server()
+    _Handler.status = 503
+    client = HttpClient(failure_threshold=1, reset_timeout=0.05)
+    try:
+        assert client.get(url).status_code == 503
+        time.sleep(0.06)
+
+        _, host = client._host(url)
+        send = host.session.request
+
+        def broken(*args, **kwargs):
+            raise RuntimeError('boom')
+
+        host.session.request = broken
+        try:
+            client.get(url)
+            assert False, "expected RuntimeError"
+        except RuntimeError:
+            pass
+        assert host.breaker.state == 'open'
+
+        host.session.request = send
+        _Handler.status = 200
+        time.sleep(0.06)
+        assert client.get(url).status_code == 200
+        assert host.breaker.state == 'closed'
+    finally:
+        client.close()
+        server.shutdown()
+    print("   ✅ Unexpected errors don't leave a trial in flight")
+
+
+def test_client_errors_do_not_trip_breaker():
+    """4xx responses are the caller's problem, not the host's"""
+    server, url = start_server()
+    _Handler.status = 404
+    client = HttpClient(failure_threshold=2)
+    try:
+        for _ in range(4):
+            assert client.get(url).status_code == 404
+        assert client.stats()[url.rstrip('/')]['circuit'] == 'closed'
+    finally:
+        client.close()
+        server.shutdown()
+    print("   ✅ 4xx responses don't open the circuit")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing Outbound HTTP Client")
+    print("=" * 60)
+    test_connections_are_reused()
+    test_default_timeout()
+    test_breaker_opens_and_recovers()
+    test_half_open_allows_one_trial()
+    test_unexpected_error_ends_trial()
+    test_client_errors_do_not_trip_breaker()
+    print("\n✅ All HTTP client tests passed!")
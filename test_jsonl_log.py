@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the append-only JSONL log used for registration backups
+Run: python3 test_jsonl_log.py
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+
+from jsonl_log import JsonlWriter, read_records
+
+
+def _append_from_process(directory, worker, count):
+    writer = JsonlWriter(directory, 'registrations', fsync_interval=0.05)
+    for i in range(count):
+        writer.append({'worker': worker, 'n': i, 'padding': 'x' * 2000})
+    writer.close()
+
+
+def test_append_and_stream_back():
+    """Records come back in order, one per line"""
+    with tempfile.TemporaryDirectory() as directory:
+        writer = JsonlWriter(directory, 'registrations', fsync_interval=0.05)
+        path = None
+        for i in range(5):
+            path = writer.append({'email': f'user{i}@example.com', 'n': i})
+        writer.close()
+
+        assert os.path.basename(path).startswith('registrations-')
+        assert path.endswith('.jsonl')
+        assert [r['n'] for r in read_records(path)] == list(range(5))
+        with open(path) as f:
+            assert len(f.read().splitlines()) == 5
+    print("   ✅ Appended records read back in order")
+
+
+def test_concurrent_processes_do_not_interleave():
+    """Several worker processes appending at once must not tear lines"""
+    with tempfile.TemporaryDirectory() as directory:
+        processes = [
+            multiprocessing.Process(target=_append_from_process, args=(directory, worker, 200))
+            for worker in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+
+        files = os.listdir(directory)
+        records = [r for name in files for r in read_records(os.path.join(directory, name))]
+        assert len(records) == 800
+        for worker in range(4):
+            assert sorted(r['n'] for r in records if r['worker'] == worker) == list(range(200))
+    print("   ✅ Concurrent processes append whole lines")
+
+
+def test_concurrent_threads():
+    """Threads in one process share the writer safely"""
+    with tempfile.TemporaryDirectory() as directory:
+        writer = JsonlWriter(directory, 'registrations', fsync_interval=0.05)
+
+        def worker(worker_id):
+            for i in range(100):
+                writer.append({'worker': worker_id, 'n': i})
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        records = [r for name in os.listdir(directory) for r in read_records(os.path.join(directory, name))]
+        assert len(records) == 800
+    print("   ✅ Concurrent threads append whole lines")
+
+
+def test_torn_last_line_is_skipped():
+    """A line cut off by a crash should not break reading the rest"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'registrations-2025-01-01.jsonl')
+        with open(path, 'w') as f:
+            f.write(json.dumps({'n': 1}) + '\n')
+            f.write(json.dumps({'n': 2}) + '\n')
+            f.write('{"n": 3, "ema')
+
+        assert [r['n'] for r in read_records(path)] == [1, 2]
+    print("   ✅ Torn last line skipped")
+
+
+def test_reads_legacy_json_array():
+    """Old registrations-YYYY-MM-DD.json files are still readable"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'registrations-2024-12-31.json')
+        with open(path, 'w') as f:
+            json.dump([{'n': 1}, {'n': 2}], f, indent=2)
+
+        assert [r['n'] for r in read_records(path)] == [1, 2]
+    print("   ✅ Legacy JSON array files supported")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing JSONL Log")
+    print("=" * 60)
+    test_append_and_stream_back()
+    test_concurrent_processes_do_not_interleave()
+    test_concurrent_threads()
+    test_torn_last_line_is_skipped()
+    test_reads_legacy_json_array()
+    print("\n✅ All JSONL log tests passed!")
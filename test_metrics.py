@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test the in-process metrics registry and its Prometheus text output
+Run: python3 test_metrics.py
+"""
+
+import threading
+import time
+import types
+
+from metrics import Registry, instrument
+
+
+def lines(registry):
+    return registry.render().splitlines()
+
+
+def test_counter_render():
+    registry = Registry(worker_label=False)
+    requests = registry.counter('http_requests_total', 'Requests', ('endpoint', 'status'))
+    requests.inc(('/api/analytics/track', 200))
+    requests.inc(('/api/analytics/track', 200))
+    requests.inc(('/api/analytics/track', 500), amount=3)
+
+    output = lines(registry)
+    assert output[0] == '# HELP http_requests_total Requests'
+    assert output[1] == '# TYPE http_requests_total counter'
+    assert 'http_requests_total{endpoint="/api/analytics/track",status="200"} 2' in output
+    assert 'http_requests_total{endpoint="/api/analytics/track",status="500"} 3' in output
+    print("   ✅ Counters rendered per label combination")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry(worker_label=False)
+    latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.01, 0.05, 0.5, 3.0):
+        latency.observe(('/',), value)
+
+    output = lines(registry)
+    assert 'latency_seconds_bucket{route="/",le="0.01"} 2' in output  # le is inclusive
+    assert 'latency_seconds_bucket{route="/",le="0.1"} 3' in output
+    assert 'latency_seconds_bucket{route="/",le="1"} 4' in output
+    assert 'latency_seconds_bucket{route="/",le="+Inf"} 5' in output
+    assert 'latency_seconds_count{route="/"} 5' in output
+    total = [line for line in output if line.startswith('latency_seconds_sum')][0]
+    assert abs(float(total.split()[-1]) - 3.565) < 1e-9
+    assert latency.count(('/',)) == 5
+    print("   ✅ Histogram buckets, sum and count")
+
+
+def test_label_escaping_and_worker_label():
+    registry = Registry()
+    errors = registry.counter('errors_total', 'Errors', ('reason',))
+    errors.inc(('say "hi"\\\n',))
+    output = registry.render()
+    assert 'reason="say \\"hi\\"\\\\\\n"' in output
+    assert 'worker="' in output
+    print("   ✅ Label values escaped, worker label added")
+
+
+def test_collected_metrics():
+    """Callbacks run at scrape time; a failing one doesn't break the scrape"""
+    registry = Registry(worker_label=False)
+    depth = {'analytics': 3}
+    registry.collect('buffer_depth', 'Queued items', lambda: {(name,): n for name, n in depth.items()}, ('buffer',))
+    registry.collect('surge', 'Surge mode', lambda: True)
+    registry.collect('ratio', 'Hit ratio', lambda: {('empty',): None})
+    registry.collect('broken', 'Broken', lambda: 1 / 0)
+    registry.counter('after_total', 'Rendered after the broken one').inc()
+
+    depth['analytics'] = 7
+    output = lines(registry)
+    assert 'buffer_depth{buffer="analytics"} 7' in output
+    assert 'surge 1' in output
+    assert not any(line.startswith('ratio{') for line in output)
+    assert any(line.startswith('# broken unavailable') for line in output)
+    assert 'after_total 1' in output
+    print("   ✅ Collected metrics read at scrape time")
+
+
+def test_duplicate_names_rejected():
+    registry = Registry()
+    registry.counter('a_total', 'A')
+    try:
+        registry.histogram('a_total', 'A again')
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("   ✅ Duplicate metric names rejected")
+
+
+def test_instrument_module():
+    """Module functions are replaced by timed versions that count failures"""
+    registry = Registry(worker_label=False)
+    seconds = registry.histogram('db_query_duration_seconds', 'DB time', ('query',))
+    errors = registry.counter('db_query_errors_total', 'DB errors', ('query',))
+
+    def get_all_analytics(limit=None):
+        """Fetch analytics"""
+        return ['row'] * (limit or 1)
+
+    def insert_analytics(data):
+        raise ValueError('Event type is required')
+
+    module = types.SimpleNamespace(get_all_analytics=get_all_analytics, insert_analytics=insert_analytics)
+    instrument(module, ('get_all_analytics', 'insert_analytics'), seconds, errors)
+
+    assert module.get_all_analytics(limit=2) == ['row', 'row']
+    assert module.get_all_analytics.__doc__ == 'Fetch analytics'
+    try:
+        module.insert_analytics({})
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert seconds.count(('get_all_analytics',)) == 1
+    assert seconds.count(('insert_analytics',)) == 1
+    assert errors.value(('insert_analytics',)) == 1
+    assert errors.value(('get_all_analytics',)) == 0
+    print("   ✅ Module functions timed per query kind")
+
+
+def test_concurrent_updates():
+    registry = Registry()
+    hits = registry.counter('hits_total', 'Hits', ('route',))
+    latency = registry.histogram('latency_seconds', 'Latency', ('route',))
+
+    def work():
+        for _ in range(5000):
+            hits.inc(('/',))
+            latency.observe(('/',), 0.002)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert hits.value(('/',)) == 40000
+    assert latency.count(('/',)) == 40000
+    print("   ✅ No lost updates from 8 threads")
+
+
+def test_recording_overhead():
+    """What the request hooks add to every request, /api/analytics/track included"""
+    registry = Registry()
+    requests = registry.counter('http_requests_total', 'Requests', ('endpoint', 'method', 'status'))
+    latency = registry.histogram('http_request_duration_seconds', 'Latency', ('endpoint', 'method'))
+    labels = ('/api/analytics/track', 'POST')
+    iterations = 100000
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        began = time.perf_counter()
+        latency.observe(labels, time.perf_counter() - began)
+        requests.inc(labels + (200,))
+    per_request = (time.perf_counter() - started) / iterations
+    assert per_request < 50e-6, per_request
+    print(f"   ✅ {per_request * 1e6:.2f} µs recorded per request")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing metrics")
+    print("=" * 60)
+    test_counter_render()
+    test_histogram_buckets_are_cumulative()
+    test_label_escaping_and_worker_label()
+    test_collected_metrics()
+    test_duplicate_names_rejected()
+    test_instrument_module()
+    test_concurrent_updates()
+    test_recording_overhead()
+    print("\n✅ All metrics tests passed!")
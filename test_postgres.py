@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+SQL-level tests for the PostgreSQL backend (schema, rollups, sketches)
+Each check creates a scratch database on the DATABASE_URL server, points
+database_unified at it and drops it again afterwards. Skipped when
+DATABASE_URL is not set.
+Run: python3 test_postgres.py
+"""
+
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+ROLLUP_TABLES = {
+    'analytics_hourly': 'bucket, event, page, hook_variant, country',
+    'registrations_hourly': 'bucket, hook_variant, country',
+    'analytics_breakdown_hourly': 'bucket, dimension, label',
+}
+
+# analytics as created before the table was partitioned
+LEGACY_ANALYTICS_COLUMNS = '''
+    id SERIAL PRIMARY KEY, event TEXT NOT NULL, page TEXT, timestamp TIMESTAMP NOT NULL,
+    visitor_id TEXT, session_id TEXT, email TEXT, name TEXT, country TEXT, city TEXT,
+    region TEXT, ip_address TEXT, timezone TEXT, referrer TEXT, user_agent TEXT,
+    screen_width INTEGER, screen_height INTEGER, language TEXT, hook_variant TEXT,
+    button_name TEXT, duration INTEGER, utm_source TEXT, utm_medium TEXT,
+    utm_campaign TEXT, utm_content TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+'''
+
+
+@contextmanager
+def scratch_database():
+    """Empty database on the DATABASE_URL server, used by database_unified while open"""
+    import psycopg2
+    from psycopg2.extensions import make_dsn
+    import database_unified
+
+    name = f'analytics_test_{uuid.uuid4().hex[:8]}'
+    admin = psycopg2.connect(DATABASE_URL)
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE DATABASE {name} ENCODING 'UTF8' TEMPLATE template0")
+
+    names = ('DATABASE_URL', '_pool', '_pool_pid', 'BACKUP_DIR', '_backup_worker', '_backup_worker_pid',
+             '_stats_cache', 'ANALYTICS_STATS_TTL', 'BACKUP_SETTLE_SECONDS', 'ANALYTICS_UNIQUE_VISITORS')
+    saved = {attr: getattr(database_unified, attr) for attr in names}
+    database_unified.DATABASE_URL = make_dsn(DATABASE_URL, dbname=name)
+    database_unified._pool = None
+    database_unified._stats_cache = {}
+    database_unified._backup_worker = None
+    database_unified.BACKUP_DIR = tempfile.mkdtemp()
+    try:
+        yield database_unified
+    finally:
+        # Backups triggered here finish against the scratch database
+        if database_unified._backup_worker is not None:
+            database_unified._backup_worker.close()
+        if database_unified._pool is not None:
+            database_unified._pool.closeall()
+        for attr, value in saved.items():
+            setattr(database_unified, attr, value)
+        admin.cursor().execute(f'DROP DATABASE {name}')
+        admin.close()
+
+
+def skipped():
+    if not DATABASE_URL:
+        print("   ⏭️  DATABASE_URL not set - skipped")
+        return True
+    return False
+
+
+def events(count, hour=10, prefix='e'):
+    """Mixed page visits, clicks and exits inside one hour of 2025-03-01"""
+    pages = ['/', '/index.html', '/thank-you.html', None]
+    referrers = ['https://www.google.com/search?q=shift', 'https://facebook.com/', 'Direct', None]
+    buttons = ['WhatsApp Share', 'Join Community Button', 'Add to Calendar', None]
+    rows = []
+    for n in range(count):
+        kind = ('page_visit', 'page_visit', 'button_click', 'page_exit')[n % 4]
+        row = {
+            'event': kind,
+            'timestamp': f'2025-03-01T{hour:02d}:{n % 60:02d}:{n % 37:02d}Z',
+            'page': pages[n % len(pages)],
+            'referrer': referrers[n % len(referrers)],
+            'visitorId': f'visitor-{n % 23}' if n % 11 else None,
+            'sessionId': f'session-{n % 29}',
+            'hookVariant': ('A', 'B', None)[n % 3],
+            'country': ('Canada', 'US', None)[n % 3],
+            'eventId': f'{prefix}{hour}-{n}',
+        }
+        if kind == 'button_click':
+            row['buttonName'] = buttons[n % len(buttons)]
+        rows.append(row)
+    return rows
+
+
+def test_fresh_init_db():
+    """A new database gets a partitioned analytics table with this month's partition"""
+    if skipped():
+        return
+    with scratch_database() as db:
+        db.init_db()
+        db.init_db()  # idempotent (every gunicorn worker runs it)
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'analytics'::regclass")
+            assert cursor.fetchone()['relkind'] == 'p'
+
+        partitions = db.get_analytics_partitions()
+        assert partitions[-1]['name'] == 'analytics_default' and partitions[-1]['default']
+        monthly = [p for p in partitions if not p['default']]
+        assert len(monthly) == db.ANALYTICS_PARTITION_MONTHS_AHEAD + 1
+        this_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        assert monthly[0]['start'] == this_month
+        assert db.ensure_analytics_partitions() == []
+    print("   ✅ Fresh database partitioned by month")
+
+
+def test_legacy_table_converted():
+    """A plain analytics table from before partitioning is attached in place"""
+    if skipped():
+        return
+    with scratch_database() as db:
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'CREATE TABLE analytics ({LEGACY_ANALYTICS_COLUMNS})')
+            cursor.execute('CREATE INDEX idx_analytics_timestamp ON analytics(timestamp)')
+            cursor.execute('CREATE INDEX idx_analytics_visitor ON analytics(visitor_id)')
+            for n in range(5):
+                cursor.execute('''
+                    INSERT INTO analytics (event, page, timestamp, visitor_id)
+                    VALUES ('page_visit', '/', %s, %s)
+                ''', (f'2024-06-0{n + 1}T12:00:00', f'legacy-{n}'))
+
+        db.init_db()
+        partitions = {p['name']: p for p in db.get_analytics_partitions()}
+        assert partitions['analytics_legacy']['start'] is None
+        rows = db.get_all_analytics()
+        assert sorted(row['visitor_id'] for row in rows) == [f'legacy-{n}' for n in range(5)]
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) AS count FROM analytics_legacy')
+            assert cursor.fetchone()['count'] == 5
+
+        # Ids carry on from the old sequence; the rollups were backfilled
+        new_id = db.insert_analytics({'event': 'page_visit', 'page': '/', 'visitorId': 'new',
+                                    'timestamp': datetime.utcnow().isoformat()})
+        assert new_id > max(row['id'] for row in rows)
+        overview = db.get_analytics_summary(sections=['overview'])['overview']
+        assert overview['page_views'] == 6
+    print("   ✅ Legacy table converted without copying rows")
+
+
+def test_duplicate_event_id_dropped():
+    """A re-sent batch (same eventId and timestamp) is not stored or counted twice"""
+    if skipped():
+        return
+    with scratch_database() as db:
+        db.init_db()
+        batch = events(8, hour=9)
+        assert db.insert_analytics_batch(batch) == 8
+        assert db.insert_analytics_batch(batch[:3] + events(2, hour=9, prefix='retry')) == 2
+        assert len(db.get_all_analytics()) == 10
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT SUM(count) AS count FROM analytics_hourly')
+            assert cursor.fetchone()['count'] == 10
+    print("   ✅ Duplicate event ids dropped")
+
+
+def rollup_rows(cursor, table):
+    cursor.execute(f'''
+        SELECT {ROLLUP_TABLES[table]}, count FROM {table}
+        WHERE count <> 0
+        ORDER BY {ROLLUP_TABLES[table]}
+    ''')
+    return [tuple(row.values()) for row in cursor.fetchall()]
+
+
+def sketch_rows(cursor):
+    cursor.execute('''
+        SELECT bucket, event, label, hook_variant, register, rank FROM analytics_visitors_hourly_hll
+        ORDER BY bucket, event, label, hook_variant, register
+    ''')
+    return [tuple(row.values()) for row in cursor.fetchall()]
+
+
+def test_rollups_match_rebuild():
+    """Rollups kept up by the insert/delete CTEs equal a rebuild from the raw rows"""
+    if skipped():
+        return
+    with scratch_database() as db:
+        db.init_db()
+        db.insert_analytics_batch(events(120, hour=10) + events(80, hour=11))
+        for row in events(12, hour=12, prefix='single'):
+            db.insert_analytics(row)
+        for n in range(6):
+            db.insert_registration({'email': f'person{n}@example.com', 'firstName': 'Test',
+                                    'hookVariant': 'AB'[n % 2], 'timestamp': f'2025-03-01T1{n % 3}:05:00Z'})
+
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            maintained = {table: rollup_rows(cursor, table) for table in ROLLUP_TABLES}
+            sketch = sketch_rows(cursor)
+        db.rebuild_rollups()
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            for table in ROLLUP_TABLES:
+                assert rollup_rows(cursor, table) == maintained[table], table
+            assert sketch_rows(cursor) == sketch
+
+        # Deletes take their rows back out of the count rollups
+        for row in db.get_all_analytics(limit=15, fields='id'):
+            assert db.delete_analytics_event(row['id'])
+        db.delete_registration(db.get_all_registrations(fields='id')[0]['id'])
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            maintained = {table: rollup_rows(cursor, table) for table in ROLLUP_TABLES}
+        db.rebuild_rollups()
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            for table in ROLLUP_TABLES:
+                assert rollup_rows(cursor, table) == maintained[table], table
+    print("   ✅ Incremental rollups and sketches match a rebuild")
+
+
+def test_summary_matches_raw_rows():
+    """Summary counts equal raw counts, for whole hours and for partial edge hours"""
+    if skipped():
+        return
+    with scratch_database() as db:
+        db.init_db()
+        rows = events(120, hour=10) + events(80, hour=11) + events(40, hour=12)
+        db.insert_analytics_batch(rows)
+
+        for start, end in ((None, None), ('2025-03-01T10:30:00', '2025-03-01T12:10:00'),
+                           ('2025-03-01T11:05:00', '2025-03-01T11:40:00')):
+            selected = [row for row in rows
+                        if (start is None or row['timestamp'][:19] >= start)
+                        and (end is None or row['timestamp'][:19] <= end)]
+            visits = [row for row in selected if row['event'] == 'page_visit']
+            clicks = [row for row in selected if row['event'] == 'button_click']
+            db.ANALYTICS_UNIQUE_VISITORS = 'exact'
+            summary = db.get_analytics_summary(start, end, sections=['overview', 'ab_test', 'hourly'])
+            overview = summary['overview']
+
+            assert overview['page_views'] == len(visits)
+            assert overview['button_clicks'] == len(clicks)
+            expected_buttons = {}
+            for row in clicks:
+                name = row.get('buttonName') or 'Unknown'
+                expected_buttons[name] = expected_buttons.get(name, 0) + 1
+            assert overview['buttons'] == expected_buttons
+            assert sum(overview['referrers'].values()) == len(selected)
+
+            visitors = {row['visitorId'] or row['sessionId'] for row in visits}
+            assert overview['unique_visitors'] == len(visitors)
+            for variant in ('A', 'B'):
+                variant_visitors = {row['visitorId'] or row['sessionId'] for row in visits if row['hookVariant'] == variant}
+                assert summary['ab_test'][variant]['visitors'] == len(variant_visitors)
+            hourly = [0] * 24
+            for hour in range(24):
+                hourly[hour] = len({row['visitorId'] for row in visits
+                                    if row['visitorId'] and int(row['timestamp'][11:13]) == hour})
+            assert summary['hourly'] == hourly
+
+            # Small counts: the sketch is within a visitor or two of exact
+            db.ANALYTICS_UNIQUE_VISITORS = 'hll'
+            estimated = db.get_analytics_summary(start, end, sections=['overview'])['overview']
+            assert abs(estimated['unique_visitors'] - len(visitors)) <= 1 + len(visitors) * 0.05
+    print("   ✅ Summary counts match the raw rows")
+
+
+def test_keyset_pages():
+    """Paging newest first returns every row once, even with tied timestamps"""
+    if skipped():
+        return
+    with scratch_database() as db:
+        db.init_db()
+        rows = events(50, hour=10)
+        for row in rows[:20]:
+            row['timestamp'] = '2025-03-01T10:30:00Z'  # one tie spanning several pages
+        db.insert_analytics_batch(rows)
+        for n in range(7):
+            db.insert_waitinglist({'email': f'wait{n}@example.com', 'timestamp': f'2025-03-01T09:00:0{n % 3}Z'})
+
+        def all_pages(fetch, **filters):
+            items, cursor, pages = [], None, 0
+            while True:
+                page = fetch(cursor=cursor, page_size=7, **filters)
+                items.extend(page['items'])
+                pages += 1
+                cursor = page['next_cursor']
+                if cursor is None:
+                    return items, pages
+
+        items, pages = all_pages(db.get_analytics_page, fields='id,timestamp')
+        assert pages == 8 and len(items) == 50
+        assert len({item['id'] for item in items}) == 50
+        keys = [(item['timestamp'], item['id']) for item in items]
+        assert keys == sorted(keys, reverse=True)
+        assert set(items[0]) == {'id', 'timestamp'}
+
+        clicks, _ = all_pages(db.get_analytics_page, event_type='button_click',
+                              start_date='2025-03-01T10:20:00', end_date='2025-03-01T10:40:00')
+        expected = [row for row in rows if row['event'] == 'button_click'
+                    and '2025-03-01T10:20:00' <= row['timestamp'][:19] <= '2025-03-01T10:40:00']
+        assert len(clicks) == len(expected)
+
+        entries, _ = all_pages(db.get_waitinglist_page)
+        assert sorted(entry['email'] for entry in entries) == [f'wait{n}@example.com' for n in range(7)]
+
+        try:
+            db.get_analytics_page(cursor='not-a-cursor')
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    print("   ✅ Keyset pages cover every row exactly once")
+
+
+def test_data_version_triggers():
+    """Every write statement bumps its own table's version and no other"""
+    if skipped():
+        return
+    tables = ('analytics', 'registrations', 'waiting_list', 'zoom_optins')
+    with scratch_database() as db:
+        db.init_db()
+
+        def bumped(write):
+            before = db.get_data_versions(tables)
+            write()
+            after = db.get_data_versions(tables)
+            return {table for table in tables if after[table] != before[table]}
+
+        assert bumped(lambda: db.insert_analytics_batch(events(5))) == {'analytics'}
+        assert bumped(lambda: db.insert_registration({'email': 'a@example.com', 'firstName': 'A',
+                                                    'timestamp': '2025-03-01T10:00:00Z'})) == {'registrations'}
+        assert bumped(lambda: db.insert_waitinglist({'email': 'w@example.com'})) == {'waiting_list'}
+        assert bumped(lambda: db.insert_zoom_optin({'email': 'z@example.com', 'name': 'Z',
+                                                 'optin_timestamp': '2025-03-01T10:00:00Z'})) == {'zoom_optins'}
+        row_id = db.get_all_analytics(limit=1, fields='id')[0]['id']
+        assert bumped(lambda: db.delete_analytics_event(row_id)) == {'analytics'}
+
+        def truncate():
+            with db.get_db() as conn:
+                conn.cursor().execute('TRUNCATE registrations')
+        assert bumped(truncate) == {'registrations'}
+    print("   ✅ data_versions bumped by the triggers")
+
+
+def test_hll_stats():
+    """SQL sketch registers match hll.register_for, and estimates track exact counts"""
+    if skipped():
+        return
+    import hll
+    with scratch_database() as db:
+        db.init_db()
+        db.ANALYTICS_STATS_TTL = 0
+        rows = events(200, hour=10) + events(100, hour=14, prefix='late')
+        db.insert_analytics_batch(rows)
+
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT DISTINCT hashtextextended(visitor_id, 0) AS h
+                FROM analytics WHERE visitor_id IS NOT NULL
+            ''')
+            expected = {}
+            for row in cursor.fetchall():
+                register, rank = hll.register_for(row['h'], db.ANALYTICS_HLL_PRECISION)
+                expected[register] = max(rank, expected.get(register, 0))
+            cursor.execute('SELECT register, MAX(rank) AS rank FROM analytics_visitors_hll GROUP BY register')
+            assert {row['register']: row['rank'] for row in cursor.fetchall()} == expected
+
+        exact = db.get_analytics_stats(approximate=False)
+        approximate = db.get_analytics_stats(approximate=True)
+        visitors = {row['visitorId'] for row in rows if row['visitorId']}
+        assert exact['unique_visitors'] == len(visitors)
+        assert abs(approximate['unique_visitors'] - len(visitors)) <= 1
+        assert exact['events_by_type'] == approximate['events_by_type']
+        assert exact['total_events'] == len(rows)
+
+        variant_a = {row['visitorId'] for row in rows
+                     if row['visitorId'] and row['hookVariant'] == 'A' and row['page'] == '/'}
+        assert abs(db.estimate_unique_visitors(page='/', hook_variant='A') - len(variant_a)) <= 1
+    print("   ✅ HyperLogLog registers and stats")
+
+
+def test_backup_stops_below_unsettled_rows():
+    """A settled row committed after a lower, still-settling id doesn't move the watermark past it"""
+    if skipped():
+        return
+    import backup_worker
+    with scratch_database() as db:
+        db.init_db()
+        db.insert_analytics_batch(events(3))
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM analytics ORDER BY id')
+            first, middle, last = [row['id'] for row in cursor.fetchall()]
+            # The middle row's transaction started last (it is still settling)
+            cursor.execute("UPDATE analytics SET created_at = now() - interval '1 hour' WHERE id <> %s", (middle,))
+
+        assert db.backup_increment()['analytics'] == 1
+        assert backup_worker.read_state(db.BACKUP_DIR)['analytics']['last_id'] == first
+
+        with db.get_db() as conn:
+            conn.cursor().execute("UPDATE analytics SET created_at = now() - interval '1 hour'")
+        assert db.backup_increment()['analytics'] == 2
+        assert backup_worker.read_state(db.BACKUP_DIR)['analytics']['last_id'] == last
+    print("   ✅ Backup watermark waits for unsettled rows")
+
+
+def test_ab_chunks_stop_below_unsettled_rows():
+    """A/B watermarks don't move past a hook-variant visit that is still settling"""
+    if skipped():
+        return
+    from ab_analysis import HookABTest
+    with scratch_database() as db:
+        db.init_db()
+        db.insert_analytics_batch([dict(row, event='page_visit', hookVariant='A') for row in events(3)])
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM analytics ORDER BY id')
+            first, middle, last = [row['id'] for row in cursor.fetchall()]
+            cursor.execute("UPDATE analytics SET created_at = now() - interval '1 hour' WHERE id <> %s", (middle,))
+
+        test = HookABTest().consume(db.stream_ab_test_chunks())
+        assert test.watermarks['analytics'] == first
+
+        with db.get_db() as conn:
+            conn.cursor().execute("UPDATE analytics SET created_at = now() - interval '1 hour'")
+        test.consume(db.stream_ab_test_chunks(test.watermarks))
+        assert test.watermarks['analytics'] == last
+        assert test.totals()['visits'] == 3
+    print("   ✅ A/B watermark waits for unsettled rows")
+
+
+def test_storage_interface():
+    """Outbox, A/B chunks, backups and reset through PostgresStorage (the checks in test_storage.py)"""
+    if skipped():
+        return
+    from test_storage import EXCLUSIVE_CHECKS
+    with scratch_database() as db:
+        db.init_db()
+        db.ANALYTICS_STATS_TTL = 0
+        db.BACKUP_SETTLE_SECONDS = 0  # read rows right after inserting them
+        backend = db.PostgresStorage()
+        for check in EXCLUSIVE_CHECKS:
+            check(backend)
+    print("   ✅ CRM outbox, A/B chunks, backups and reset through the storage interface")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing PostgreSQL SQL")
+    print("=" * 60)
+    test_fresh_init_db()
+    test_legacy_table_converted()
+    test_duplicate_event_id_dropped()
+    test_rollups_match_rebuild()
+    test_summary_matches_raw_rows()
+    test_keyset_pages()
+    test_data_version_triggers()
+    test_hll_stats()
+    test_backup_stops_below_unsettled_rows()
+    test_ab_chunks_stop_below_unsettled_rows()
+    test_storage_interface()
+    print("\n✅ All PostgreSQL tests passed!")
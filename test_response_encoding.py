@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test response compression negotiation, the columnar shape and the body cache
+Run: python3 test_response_encoding.py
+"""
+
+import gzip
+import json
+
+import response_encoding
+from response_encoding import (EncodedBodyCache, Compressor, choose_encoding,
+                               compress, to_columnar)
+
+
+def test_choose_encoding():
+    """Accept-Encoding q-values are honoured"""
+    assert choose_encoding('gzip, deflate') == 'gzip'
+    assert choose_encoding('deflate') is None
+    assert choose_encoding('') is None
+    assert choose_encoding(None) is None
+    assert choose_encoding('gzip;q=0') is None
+    assert choose_encoding('*') in ('br', 'gzip')
+    assert choose_encoding('identity, *;q=0') is None
+    if response_encoding.brotli:
+        assert choose_encoding('gzip, br') == 'br'
+        assert choose_encoding('gzip;q=1.0, br;q=0.5') == 'gzip'
+    else:
+        assert choose_encoding('br') is None
+    print("   ✅ Accept-Encoding negotiation")
+
+
+def test_gzip_round_trip():
+    """Whole-body and chunked compression both produce valid gzip"""
+    body = json.dumps([{'event': 'page_visit', 'page': '/index.html', 'id': i} for i in range(2000)]).encode()
+    whole = compress(body, 'gzip')
+    assert gzip.decompress(whole) == body
+    assert len(whole) < len(body) / 5
+
+    compressor = Compressor('gzip')
+    chunks = [compressor.compress(body[i:i + 1000]) for i in range(0, len(body), 1000)]
+    chunks.append(compressor.finish())
+    assert gzip.decompress(b''.join(chunks)) == body
+    print(f"   ✅ gzip round trip ({len(body)} -> {len(whole)} bytes)")
+
+
+def test_brotli_round_trip():
+    """Brotli is used when the optional package is installed"""
+    if not response_encoding.brotli:
+        print("   ⏭️  brotli not installed - skipped")
+        return
+    body = b'{"a": 1}' * 1000
+    assert response_encoding.brotli.decompress(compress(body, 'br')) == body
+    print("   ✅ brotli round trip")
+
+
+def test_columnar_shape():
+    """Rows become one array per column"""
+    rows = [{'id': 1, 'page': '/a'}, {'id': 2, 'page': '/b'}, {'id': 3, 'page': None}]
+    assert to_columnar(rows) == {'count': 3, 'columns': {'id': [1, 2, 3], 'page': ['/a', '/b', None]}}
+    assert to_columnar(iter(rows))['count'] == 3
+    assert to_columnar([]) == {'count': 0, 'columns': {}}
+    print("   ✅ Columnar shape")
+
+
+def test_body_cache():
+    """Bodies are cached per key; oversized bodies are skipped"""
+    cache = EncodedBodyCache(maxsize=2, max_body_bytes=10)
+    cache.set(('a', 1), b'small', 'gzip', 'application/json')
+    cache.set(('b', 1), b'way too large', 'gzip', 'application/json')
+
+    assert cache.get(('a', 1)) == (b'small', 'gzip', 'application/json')
+    assert cache.get(('a', 2)) is None  # new data version -> miss
+    assert cache.get(('b', 1)) is None
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+    assert stats['stored'] == 1
+    assert stats['too_large'] == 1
+    print("   ✅ Body cache keyed by version, size-capped")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing Response Encoding")
+    print("=" * 60)
+    test_choose_encoding()
+    test_gzip_round_trip()
+    test_brotli_round_trip()
+    test_columnar_shape()
+    test_body_cache()
+    print("\n✅ All response encoding tests passed!")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Test the LISTEN/NOTIFY settings cache with a fake connection (no database needed)
+Run: python3 test_settings_cache.py
+"""
+
+import socket
+import threading
+import time
+
+from settings_cache import SettingsCache
+
+
+class FakeListenConnection:
+    """Just enough of a psycopg2 connection for LISTEN: fileno/poll/notifies"""
+
+    def __init__(self):
+        self._reader, self._writer = socket.socketpair()
+        self.autocommit = False
+        self.notifies = []
+        self.listening = []
+        self.closed = False
+
+    def cursor(self):
+        conn = self
+
+        class _Cursor:
+            def execute(self, sql):
+                conn.listening.append(sql)
+        return _Cursor()
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def poll(self):
+        if self.closed:
+            raise OSError('connection closed')
+        self._reader.recv(1024)
+
+    def notify(self):
+        self.notifies.append('settings_changed')
+        self._writer.send(b'x')
+
+    def drop(self):
+        """Simulate the server going away"""
+        self.closed = True
+        self._writer.send(b'x')
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSettingsTable:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 1
+        self.settings = {'site_closed': {'value': 'false', 'updated_at': None}}
+        self.loads = 0
+
+    def load(self):
+        with self.lock:
+            self.loads += 1
+            return self.version, {key: dict(value) for key, value in self.settings.items()}
+
+    def write(self, key, value):
+        with self.lock:
+            self.version += 1
+            self.settings[key] = {'value': value, 'updated_at': None}
+
+
+def wait_until(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def make_cache(table, connections):
+    def connect():
+        conn = FakeListenConnection()
+        connections.append(conn)
+        return conn
+    return SettingsCache(table.load, connect, 'settings_changed', poll_interval=0.05, retry_delay=0.05)
+
+
+def test_reads_come_from_memory():
+    """After warm-up, reads don't call the loader"""
+    table = FakeSettingsTable()
+    connections = []
+    cache = make_cache(table, connections)
+    try:
+        assert cache.wait_synced(2)
+        loads = table.loads
+        for _ in range(100):
+            assert cache.get_all()['site_closed']['value'] == 'false'
+        assert table.loads == loads
+        assert connections[0].listening == ['LISTEN settings_changed']
+        assert connections[0].autocommit is True
+        assert cache.stats()['hits'] == 100
+    finally:
+        cache.close()
+    print("   ✅ Hot-path reads served from memory")
+
+
+def test_notify_refreshes():
+    """A notification reloads the snapshot"""
+    table = FakeSettingsTable()
+    connections = []
+    cache = make_cache(table, connections)
+    try:
+        assert cache.wait_synced(2)
+        table.write('site_closed', 'true')
+        assert cache.get_all()['site_closed']['value'] == 'false'  # not notified yet
+        connections[0].notify()
+        assert wait_until(lambda: cache.get_all()['site_closed']['value'] == 'true')
+        assert cache.version() == 2
+        assert cache.stats()['notifications'] == 1
+    finally:
+        cache.close()
+    print("   ✅ NOTIFY refreshes the snapshot")
+
+
+def test_lost_listener_falls_back_then_resyncs():
+    """While disconnected, reads go to the loader; the cache resyncs on reconnect"""
+    table = FakeSettingsTable()
+    connections = []
+    cache = make_cache(table, connections)
+    try:
+        assert cache.wait_synced(2)
+        connections[0].drop()
+        assert wait_until(lambda: cache.stats()['reconnects'] == 1)
+        assert wait_until(lambda: len(connections) == 2 and cache.version() is not None)
+
+        # A write made while the listener was down is picked up by the resync
+        table.write('site_closed', 'true')
+        connections[1].drop()
+        assert wait_until(lambda: len(connections) == 3 and cache.version() == 2)
+        assert cache.get_all()['site_closed']['value'] == 'true'
+    finally:
+        cache.close()
+    print("   ✅ Falls back to the database and resyncs after reconnecting")
+
+
+def test_out_of_sync_reads_hit_loader():
+    """Before the listener is up, reads still work (straight from the loader)"""
+    table = FakeSettingsTable()
+
+    def failing_connect():
+        raise OSError('database unavailable')
+
+    cache = SettingsCache(table.load, failing_connect, 'settings_changed', poll_interval=0.05, retry_delay=10)
+    try:
+        assert cache.get_all()['site_closed']['value'] == 'false'
+        assert cache.version() is None
+        assert cache.stats()['fallback_reads'] == 1
+    finally:
+        cache.close()
+    print("   ✅ Reads fall back to the loader while out of sync")
+
+
+def test_older_snapshot_never_replaces_newer():
+    """A slow load finishing late can't roll the cache back"""
+    table = FakeSettingsTable()
+    connections = []
+    cache = make_cache(table, connections)
+    try:
+        assert cache.wait_synced(2)
+        table.write('site_closed', 'true')
+        cache.refresh()
+        assert cache.version() == 2
+
+        cache._load = lambda: (1, {'site_closed': {'value': 'false', 'updated_at': None}})
+        cache.refresh()
+        assert cache.version() == 2
+        assert cache.get_all()['site_closed']['value'] == 'true'
+    finally:
+        cache.close()
+    print("   ✅ Stale loads ignored")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing Settings Cache")
+    print("=" * 60)
+    test_reads_come_from_memory()
+    test_notify_refreshes()
+    test_lost_listener_falls_back_then_resyncs()
+    test_out_of_sync_reads_hit_loader()
+    test_older_snapshot_never_replaces_newer()
+    print("\n✅ All settings cache tests passed!")
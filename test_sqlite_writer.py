@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Test the single-writer SQLite thread with group commit (temporary files only)
+Run: python3 test_sqlite_writer.py
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlite_writer import SQLiteWriter, WriterClosedError
+
+
+def make_writer(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(), 'writer.db')
+    setup = sqlite3.connect(path)
+    setup.execute('PRAGMA journal_mode = WAL')
+    setup.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)')
+    setup.close()
+    writer = SQLiteWriter('test', lambda: sqlite3.connect(path, isolation_level=None), **kwargs)
+    return writer, path
+
+
+def insert(name):
+    return lambda conn: conn.execute('INSERT INTO items (name) VALUES (?)', (name,)).lastrowid
+
+
+def count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_result_is_committed():
+    """execute() returns the operation's result once it is visible to other connections"""
+    writer, path = make_writer()
+    row_id = writer.execute(insert('first'))
+    assert row_id == 1
+    assert count(path) == 1
+    writer.close()
+    print("   ✅ Results returned after commit")
+
+
+def test_concurrent_writes_share_transactions():
+    """Operations queued together are committed together"""
+    writer, path = make_writer()
+    gate = threading.Event()
+    writer.submit(lambda conn: gate.wait(2))  # hold the writer while work queues up
+
+    futures = [writer.submit(insert(f'item-{i}')) for i in range(200)]
+    gate.set()
+    ids = [future.result(5) for future in futures]
+
+    assert sorted(ids) == list(range(1, 201))
+    assert count(path) == 200
+    stats = writer.stats()
+    assert stats['operations'] == 201
+    assert stats['transactions'] <= 3, stats
+    assert stats['max_batch'] >= 100
+    writer.close()
+    print(f"   ✅ 201 operations in {stats['transactions']} transactions")
+
+
+def test_failing_operation_is_isolated():
+    """A failing operation raises in its caller; the rest of its batch commits"""
+    writer, path = make_writer()
+    gate = threading.Event()
+    writer.submit(lambda conn: gate.wait(2))
+    good = writer.submit(insert('a'))
+    duplicate = writer.submit(insert('a'))
+    also_good = writer.submit(insert('b'))
+    gate.set()
+
+    assert good.result(5) and also_good.result(5)
+    try:
+        duplicate.result(5)
+        assert False, "expected IntegrityError"
+    except sqlite3.IntegrityError:
+        pass
+    assert count(path) == 2
+    assert writer.stats()['failed'] == 1
+    writer.close()
+    print("   ✅ Failed operation rolled back alone")
+
+
+def test_batch_size_limit():
+    writer, path = make_writer(batch_size=10)
+    gate = threading.Event()
+    writer.submit(lambda conn: gate.wait(2))
+    futures = [writer.submit(insert(f'x{i}')) for i in range(50)]
+    gate.set()
+    for future in futures:
+        future.result(5)
+    assert writer.stats()['max_batch'] == 10
+    writer.close()
+    print("   ✅ Transactions capped at batch_size")
+
+
+def test_close_drains_queue():
+    """close() writes everything already queued, then rejects new work"""
+    writer, path = make_writer()
+    gate = threading.Event()
+    writer.submit(lambda conn: gate.wait(2))
+    futures = [writer.submit(insert(f'late-{i}')) for i in range(20)]
+    threading.Timer(0.1, gate.set).start()
+    writer.close()
+
+    assert all(future.done() for future in futures)
+    assert count(path) == 20
+    try:
+        writer.execute(insert('after-close'))
+        assert False, "expected WriterClosedError"
+    except WriterClosedError:
+        pass
+    print("   ✅ close() drains the queue")
+
+
+def test_submit_racing_close():
+    """A submit already past the closed check when close() runs is still written"""
+    writer, path = make_writer()
+    put = writer._queue.put
+    queueing = threading.Event()
+
+    def slow_put(item, *args, **kwargs):
+        if item[1] is not None:  # not the stop marker
+            queueing.set()
+            time.sleep(0.2)
+        put(item, *args, **kwargs)
+
+    writer._queue.put = slow_put
+    futures = []
+    submitter = threading.Thread(target=lambda: futures.append(writer.submit(insert('racing'))))
+    submitter.start()
+    queueing.wait(2)
+    writer.close()
+    submitter.join()
+
+    assert futures[0].result(1) == 1
+    assert count(path) == 1
+    print("   ✅ Submit racing close() written, not left waiting")
+
+
+def test_timeout_cancels_unstarted_operation():
+    """A caller that times out before its operation started gets TimeoutError and nothing is written"""
+    writer, path = make_writer(timeout=0.2)
+    gate, busy = threading.Event(), threading.Event()
+    writer.submit(lambda conn: busy.set() or gate.wait(2))
+    busy.wait(2)  # the writer is in a transaction that doesn't include our operation
+    try:
+        writer.execute(insert('too-late'))
+        assert False, "expected TimeoutError"
+    except TimeoutError:
+        pass
+    gate.set()
+    writer.execute(insert('next'))
+    assert count(path) == 1
+    assert writer.stats()['cancelled'] == 1
+    writer.close()
+    print("   ✅ Timed-out operation cancelled unwritten")
+
+
+def test_timeout_waits_for_running_operation():
+    """An operation already in a transaction is waited for past the timeout"""
+    writer, path = make_writer(timeout=0.2)
+
+    def slow_insert(conn):
+        time.sleep(0.5)
+        return insert('slow')(conn)
+
+    assert writer.execute(slow_insert) == 1
+    assert count(path) == 1
+    writer.close()
+    print("   ✅ Running operation waited for, not reported as timed out")
+
+
+def test_connect_failure_reaches_callers():
+    writer = SQLiteWriter('broken', lambda: sqlite3.connect('/nonexistent/dir/x.db', isolation_level=None))
+    try:
+        writer.execute(insert('x'))
+        assert False, "expected OperationalError"
+    except sqlite3.OperationalError:
+        pass
+    writer.close()
+    print("   ✅ Connection errors raised in the caller")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing SQLite writer")
+    print("=" * 60)
+    test_result_is_committed()
+    test_concurrent_writes_share_transactions()
+    test_failing_operation_is_isolated()
+    test_batch_size_limit()
+    test_close_drains_queue()
+    test_submit_racing_close()
+    test_timeout_cancels_unstarted_operation()
+    test_timeout_waits_for_running_operation()
+    test_connect_failure_reaches_callers()
+    print("\n✅ All SQLite writer tests passed!")
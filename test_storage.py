@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Conformance and performance tests for the storage backends
+Every check runs against SQLite (a temporary file) and, when DATABASE_URL
+is set, against PostgreSQL too. Rows are tagged with a random marker and
+removed again after each check.
+Run: python3 test_storage.py
+"""
+
+import json
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import storage
+from database_sqlite import SQLiteStorage
+from storage import ANALYTICS_FIELDS, REGISTRATION_FIELDS
+
+MARKER = uuid.uuid4().hex[:8]
+BATCH_EVENTS = 2000
+CONCURRENT_WRITERS = 8
+
+_backends = None
+
+
+def backends():
+    """SQLite always, PostgreSQL when configured (each initialized once)"""
+    global _backends
+    if _backends is None:
+        directory = tempfile.mkdtemp()
+        sqlite = SQLiteStorage(os.path.join(directory, 'conformance.db'), backup_dir=os.path.join(directory, 'backups'))
+        sqlite.init_db()
+        _backends = [sqlite]
+        if os.getenv('DATABASE_URL'):
+            import database_unified
+            database_unified.ANALYTICS_STATS_TTL = 0  # read our own writes
+            postgres = storage.get_storage('postgres')
+            postgres.init_db()
+            _backends.append(postgres)
+    return _backends
+
+
+def cleanup(backend):
+    """Remove this run's rows (the PostgreSQL database may be shared)"""
+    for row in backend.get_all_analytics(event_type=f'conformance_{MARKER}', fields='id'):
+        backend.delete_analytics_event(row['id'])
+    for row in backend.get_all_registrations(fields='id,email'):
+        if MARKER in row['email']:
+            backend.delete_registration(row['id'])
+
+    if backend.name == 'postgres':
+        import database_unified
+        get_db, placeholder = database_unified.get_db, '%s'
+    else:
+        get_db, placeholder = backend.get_db, '?'
+    with get_db() as conn:
+        cursor = conn.cursor()
+        for table, column in (('waiting_list', 'email'), ('zoom_optins', 'email'), ('settings', 'key')):
+            cursor.execute(f'DELETE FROM {table} WHERE {column} LIKE {placeholder}', (f'%{MARKER}%',))
+    if backend.name == 'postgres':
+        database_unified.get_settings_cache().refresh()
+
+
+def event(n, **extra):
+    return {
+        'event': f'conformance_{MARKER}',
+        'page': '/index.html',
+        'timestamp': f'2025-03-01T10:00:{n % 60:02d}.{n:06d}Z',
+        'visitorId': f'visitor-{MARKER}-{n}',
+        'sessionId': f'session-{MARKER}-{n}',
+        'hookVariant': 'A' if n % 2 else 'B',
+        'country': 'Canada',
+        'screenWidth': 1280,
+        'eventId': f'{MARKER}-{n}',
+        **extra,
+    }
+
+
+def registration(n, **extra):
+    return {
+        'email': f'person{n}-{MARKER}@example.com',
+        'firstName': 'Test',
+        'lastName': f'Person {n}',
+        'country': 'Canada',
+        'hookVariant': 'A',
+        'timestamp': f'2025-03-01T11:00:{n:02d}Z',
+        **extra,
+    }
+
+
+def test_round_trip():
+    """Inserted rows come back with every column and datetime timestamps"""
+    for backend in backends():
+        event_id = backend.insert_analytics(event(1, duration=42))
+        row = backend.get_analytics_event_by_id(event_id)
+        assert tuple(row) == ANALYTICS_FIELDS, backend.name
+        assert row['timestamp'] == datetime(2025, 3, 1, 10, 0, 1, 1)
+        assert isinstance(row['created_at'], datetime)
+        assert (row['visitor_id'], row['screen_width'], row['duration']) == (f'visitor-{MARKER}-1', 1280, 42)
+
+        registration_id = backend.insert_registration(registration(1))
+        row = backend.get_registration_by_id(registration_id)
+        assert tuple(row) == REGISTRATION_FIELDS, backend.name
+        assert row['timestamp'] == datetime(2025, 3, 1, 11, 0, 1)
+        assert row['email'] == f'person1-{MARKER}@example.com'
+
+        assert backend.get_analytics_event_by_id(-1) is None
+        assert backend.get_registration_by_id(-1) is None
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: round trip")
+
+
+def test_validation_and_duplicates():
+    for backend in backends():
+        for bad in ({'timestamp': '2025-03-01T10:00:00Z'}, {'event': 'page_visit'}):
+            try:
+                backend.insert_analytics(bad)
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+
+        assert backend.insert_registration(registration(2)) is not None
+        assert backend.insert_registration(registration(2)) is None
+
+        entry = {'email': f'wait-{MARKER}@example.com', 'firstName': 'W', 'timestamp': '2025-03-02T09:30:00'}
+        assert backend.insert_waitinglist(entry) is not None
+        assert backend.insert_waitinglist(dict(entry)) is None
+        try:
+            backend.insert_waitinglist({'firstName': 'No email'})
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        waiting = [e for e in backend.get_all_waitinglist() if e['email'] == entry['email']]
+        assert len(waiting) == 1 and waiting[0]['timestamp'] == '2025-03-02T09:30:00'
+
+        optin_id = backend.insert_zoom_optin({'email': f'zoom-{MARKER}@example.com', 'name': 'Z',
+                                              'optin_timestamp': '2025-03-02T10:00:00Z'})
+        optins = [o for o in backend.get_all_zoom_optins() if o['id'] == optin_id]
+        assert optins[0]['optin_timestamp'] == '2025-03-02T10:00:00'
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: validation and duplicates")
+
+
+def test_batch_is_idempotent():
+    """A re-sent batch (same eventId + timestamp) inserts nothing"""
+    for backend in backends():
+        events = [event(n) for n in range(10, 20)]
+        assert backend.insert_analytics_batch(events) == 10
+        assert backend.insert_analytics_batch(events) == 0
+        assert backend.insert_analytics_batch(events[:5] + [event(20)]) == 1
+        assert backend.insert_analytics_batch([]) == 0
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: idempotent batches")
+
+
+def test_filters_and_projection():
+    for backend in backends():
+        backend.insert_analytics_batch([event(n) for n in range(30, 40)])
+        kind = f'conformance_{MARKER}'
+
+        rows = backend.get_all_analytics(event_type=kind)
+        assert len(rows) == 10
+        assert [r['timestamp'] for r in rows] == sorted((r['timestamp'] for r in rows), reverse=True)
+
+        rows = backend.get_all_analytics(event_type=kind, start_date='2025-03-01T10:00:33Z',
+                                         end_date='2025-03-01T10:00:36.999999', limit=2,
+                                         fields='event_id,timestamp')
+        assert [r['event_id'] for r in rows] == [f'{MARKER}-36', f'{MARKER}-35']
+        assert list(rows[0]) == ['event_id', 'timestamp']
+
+        try:
+            backend.get_all_analytics(fields='id,password')
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: filters, ordering and ?fields=")
+
+
+def test_stats_and_deletes():
+    """Stats have the same keys everywhere and follow inserts and deletes"""
+    for backend in backends():
+        before = backend.get_analytics_stats()
+        assert set(before) == {'events_by_type', 'total_events', 'total_registrations',
+                               'unique_visitors', 'unique_visitors_approximate'}
+
+        ids = [backend.insert_analytics(event(n)) for n in range(40, 43)]
+        registration_id = backend.insert_registration(registration(3))
+        after = backend.get_analytics_stats()
+        counts = {item['event']: item['count'] for item in after['events_by_type']}
+        assert counts[f'conformance_{MARKER}'] == 3
+        assert after['total_events'] == before['total_events'] + 3
+        assert after['total_registrations'] == before['total_registrations'] + 1
+        assert after['unique_visitors'] == before['unique_visitors'] + 3
+
+        assert backend.delete_analytics_event(ids[0]) is True
+        assert backend.delete_analytics_event(ids[0]) is False
+        assert backend.delete_registration(registration_id) is True
+        assert backend.delete_registration(registration_id) is False
+        final = backend.get_analytics_stats()
+        assert final['total_events'] == before['total_events'] + 2
+        assert final['total_registrations'] == before['total_registrations']
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: stats and deletes")
+
+
+def test_referral_stats():
+    for backend in backends():
+        referrer = backend.insert_registration(registration(4))
+        backend.insert_registration(registration(5, referredBy=referrer))
+        backend.insert_registration(registration(6, referredBy=referrer))
+        backend.insert_analytics(event(50, referredBy=referrer))
+
+        stats = backend.get_referral_stats(referrer)
+        assert stats['referrer_id'] == referrer
+        assert (stats['total_referrals'], stats['total_visits']) == (2, 1)
+        assert [r['last_name'] for r in stats['referrals']] == ['Person 6', 'Person 5']
+        assert isinstance(stats['referrals'][0]['timestamp'], datetime)
+
+        overall = backend.get_referral_stats()
+        assert {'referred_by': referrer, 'referral_count': 2} in overall['top_referrers']
+        assert set(overall) == {'total_referrals', 'total_visits', 'top_referrers'}
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: referral stats")
+
+
+def test_settings():
+    for backend in backends():
+        assert backend.get_setting('site_closed') in ('true', 'false')
+        key = f'conformance_{MARKER}'
+        assert backend.get_setting(key) is None
+        backend.set_setting(key, 'one')
+        assert backend.get_setting(key) == 'one'
+        backend.set_settings({key: 'two', f'{key}_b': 'three'})
+        settings = backend.get_all_settings()
+        assert settings[key]['value'] == 'two' and settings[f'{key}_b']['value'] == 'three'
+        assert isinstance(settings[key]['updated_at'], str)
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: settings")
+
+
+def test_pages_and_streams():
+    """Keyset pages and streaming exports return the same rows as get_all_*"""
+    for backend in backends():
+        kind = f'conformance_{MARKER}'
+        backend.insert_analytics_batch([event(n) for n in range(55, 60)])
+        expected = [row['id'] for row in backend.get_all_analytics(event_type=kind)]
+
+        ids, cursor = [], None
+        while True:
+            page = backend.get_analytics_page(event_type=kind, cursor=cursor, page_size=2, fields='id,event')
+            assert all(list(row) == ['id', 'event'] for row in page['items'])
+            ids += [row['id'] for row in page['items']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        assert ids == expected, backend.name
+        assert list(backend.stream_all_analytics(event_type=kind)) == backend.get_all_analytics(event_type=kind)
+
+        backend.insert_registration(registration(10))
+        backend.insert_registration(registration(11))
+        first = backend.get_registrations_page(page_size=1)
+        assert len(first['items']) == 1 and first['next_cursor']
+        assert {row['id'] for row in backend.stream_all_registrations(fields='id')} == \
+            {row['id'] for row in backend.get_all_registrations(fields='id')}
+
+        count = backend.get_waitinglist_count()
+        backend.insert_waitinglist({'email': f'page-{MARKER}@example.com', 'timestamp': '2025-03-02T09:30:00'})
+        assert backend.get_waitinglist_count() == count + 1
+        newest = backend.get_waitinglist_page(page_size=count + 1)['items']
+        assert any(e['email'] == f'page-{MARKER}@example.com' and e['timestamp'] == '2025-03-02T09:30:00'
+                   for e in newest)
+        assert list(backend.stream_all_waitinglist()) == backend.get_all_waitinglist()
+
+        optins = [{'email': f'batch{n}-{MARKER}@example.com', 'name': 'B',
+                   'optin_timestamp': f'2099-01-01T00:00:0{n}'} for n in range(2)]
+        assert backend.insert_zoom_optins_batch(optins) == 2
+        assert backend.insert_zoom_optins_batch([]) == 0
+        page = backend.get_zoom_optins_page(page_size=2)['items']
+        assert [o['optin_timestamp'] for o in page] == ['2099-01-01T00:00:01', '2099-01-01T00:00:00']
+        assert list(backend.stream_all_zoom_optins()) == backend.get_all_zoom_optins()
+
+        try:
+            backend.get_analytics_page(cursor='not-a-cursor')
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: keyset pages and streams")
+
+
+def test_summary():
+    """Dashboard summary sections have the same shapes and counts on every backend"""
+    # An hour of its own, so rows left by other runs on a shared database don't count
+    hour = datetime(2030, 1, 1) + timedelta(hours=int(MARKER, 16) % 50000)
+    stamp = lambda minute: (hour + timedelta(minutes=minute)).isoformat()
+    rows = [
+        event(1, event='page_visit', page='/', timestamp=stamp(1), referrer='https://www.Google.com/search'),
+        event(2, event='page_visit', page='/index.html', timestamp=stamp(2), country=None),
+        event(3, event='page_visit', page='/thank-you.html', timestamp=stamp(3)),
+        event(4, event='button_click', buttonName='WhatsApp Share', timestamp=stamp(4), visitorId=f'visitor-{MARKER}-1'),
+        event(5, event='button_click', buttonName='Add to Calendar', timestamp=stamp(5)),
+    ]
+    for backend in backends():
+        backend.insert_analytics_batch(rows)
+        backend.insert_registration(registration(15, timestamp=stamp(6)))
+        summary = backend.get_analytics_summary(start_date=stamp(0), end_date=stamp(59))
+        assert set(summary) == set(storage.SUMMARY_SECTIONS)
+
+        overview = summary['overview']
+        assert (overview['page_views'], overview['index_page_views'], overview['button_clicks']) == (3, 2, 2)
+        assert (overview['unique_visitors'], overview['index_unique_visitors']) == (3, 2), backend.name
+        assert (overview['share_clickers'], overview['calendar_clickers'], overview['community_clickers']) == (1, 1, 0)
+        assert overview['registrations'] == 1
+        assert overview['buttons'] == {'WhatsApp Share': 1, 'Add to Calendar': 1}
+        assert overview['referrers'] == {'www.google.com': 1, 'Direct': 4}
+        assert overview['countries'] == {'Canada': 1, 'Unknown': 1}
+        assert overview['pages'] == ['/', '/index.html', '/thank-you.html']
+        assert f'{hour:%Y-%m-%d}' in overview['dates']
+
+        assert summary['ab_test'] == {'A': {'visits': 2, 'visitors': 2, 'registrations': 1},
+                                      'B': {'visits': 1, 'visitors': 1, 'registrations': 0}}
+        assert summary['hourly'][hour.hour] == 3 and sum(summary['hourly']) == 3
+        shifted = backend.get_analytics_summary(stamp(0), stamp(59), ['hourly'], tz_offset=-90)
+        assert list(shifted) == ['hourly'] and shifted['hourly'][(hour.hour + 1) % 24] == 3
+        conversion = backend.get_analytics_summary(stamp(0), stamp(59), ['conversion'], bucket='hour')
+        assert conversion['conversion'] == [{'date': f'{hour:%Y-%m-%dT%H}', 'visitors': 2, 'registrations': 1}]
+
+        assert backend.estimate_unique_visitors(start_date=stamp(0), end_date=stamp(0), page='/') >= 1
+        cleanup(backend)
+        for row in backend.get_all_analytics(start_date=stamp(0), end_date=stamp(59), fields='id'):
+            backend.delete_analytics_event(row['id'])
+        print(f"   ✅ {backend.name}: analytics summary")
+
+
+def test_versions_and_page_config():
+    for backend in backends():
+        before = backend.get_data_versions()
+        assert set(before) == set(storage.VERSIONED_TABLES)
+        backend.insert_analytics(event(90))
+        after = backend.get_data_versions(('analytics', 'registrations'))
+        assert after['analytics'] != before['analytics'], backend.name
+        assert after['registrations'] == before['registrations']
+
+        config = backend.get_page_config('index')
+        assert list(config) == ['site_closed'] and config['site_closed'] in ('true', 'false')
+        assert list(backend.get_page_config('analytics')) == list(storage.PAGE_SETTINGS['analytics'])
+        assert backend.get_page_config('nope') is None
+        assert backend.warm_settings_cache() is True
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: data versions and page config")
+
+
+# The checks below claim every due outbox entry, read every hook-variant row
+# or empty the tables, so they only run on a database of their own: a fresh
+# SQLite file here, a scratch PostgreSQL database in test_postgres.py
+
+def check_outbox(backend):
+    first = backend.enqueue_outbox('conformance', {'n': 1})
+    claimed = backend.claim_outbox_batch(limit=10, lease_seconds=60)
+    assert [(e['id'], e['kind'], e['payload'], e['attempts']) for e in claimed] == [(first, 'conformance', {'n': 1}, 1)]
+    assert backend.claim_outbox_batch() == []  # leased
+
+    backend.fail_outbox(first, 'timeout', retry_in=0)
+    assert [e['attempts'] for e in backend.claim_outbox_batch()] == [2]
+    backend.fail_outbox(first, 'gone')
+    assert [(e['id'], e['payload'], e['last_error']) for e in backend.get_dead_outbox_entries()] == \
+        [(first, {'n': 1}, 'gone')]
+    stats = backend.get_outbox_stats()
+    assert (stats['pending'], stats['dead'], stats['oldest_pending_age_seconds']) == (0, 1, None)
+
+    assert backend.retry_dead_outbox(first) == 1
+    assert [e['attempts'] for e in backend.claim_outbox_batch()] == [1]
+    backend.complete_outbox(first)
+
+    # Contacts are queued with the row that triggered them, never for duplicates
+    contact = {'email': f'crm-{MARKER}@example.com'}
+    backend.insert_registration(registration(12), crm_contact=contact)
+    backend.insert_registration(registration(12), crm_contact=contact)
+    backend.insert_waitinglist({'email': contact['email']}, crm_contact=contact)
+    backend.insert_waitinglist({'email': contact['email']}, crm_contact=contact)
+    queued = backend.claim_outbox_batch()
+    assert [(e['kind'], e['payload']) for e in queued] == [(storage.CRM_CONTACT_KIND, contact)] * 2
+    for entry in queued:
+        backend.complete_outbox(entry['id'])
+    assert backend.get_outbox_stats()['delivered'] == 3
+
+
+def check_ab_test_chunks(backend):
+    def read(watermarks):
+        chunks = list(backend.stream_ab_test_chunks(watermarks, chunk_size=4))
+        rows = {table: [row for t, _, _, chunk in chunks if t == table for row in chunk]
+                for table in ('analytics', 'registrations')}
+        return chunks, rows
+
+    def advanced(watermarks, rows):
+        return {table: max([watermarks.get(table, 0)] + [row_id for _, _, row_id in rows[table]])
+                for table in rows}
+
+    start = advanced({}, read({})[1])
+    totals = backend.get_ab_test_totals()
+    visits = [event(n, event='page_visit') for n in range(60, 66)]
+    visits.append(event(66, event='page_visit', visitorId=visits[0]['visitorId'], hookVariant='B'))
+    backend.insert_analytics_batch(visits)
+    backend.insert_registration(registration(13))
+    after = backend.get_ab_test_totals()
+    assert (after['visits'] - totals['visits'], after['registrations'] - totals['registrations']) == (7, 1)
+
+    chunks, rows = read(start)
+    assert all(names == ['A', 'B'] for _, _, names, _ in chunks)
+    assert len(rows['analytics']) == 7 and len(rows['registrations']) == 1
+    assert max(len(chunk) for _, _, _, chunk in chunks) == 4
+    assert all(isinstance(value, int) for chunk in rows.values() for row in chunk for value in row)
+    assert [code for code, _, _ in rows['analytics']] == [1, 0, 1, 0, 1, 0, 1]
+    keys = [key for _, key, _ in rows['analytics']]
+    assert keys[0] == keys[-1] and len(set(keys)) == 6  # same visitor, same key
+
+    assert read(advanced(start, rows))[0] == []
+
+
+def check_backup(backend):
+    backend.backup_increment()
+    backend.insert_analytics_batch([event(n) for n in range(70, 73)])
+    assert backend.backup_increment() == {'analytics': 3, 'registrations': 0}
+    assert backend.backup_increment() == {'analytics': 0, 'registrations': 0}
+
+    status = backend.get_backup_status()
+    watermark = status['watermarks']['analytics']
+    with open(os.path.join(status['directory'], watermark['segment'])) as f:
+        exported = [json.loads(line) for line in f][-3:]
+    assert [row['event_id'] for row in exported] == [f'{MARKER}-{n}' for n in range(70, 73)]
+    assert exported[-1]['id'] == watermark['last_id']
+    assert exported[0]['timestamp'] == '2025-03-01T10:00:10.000070'
+
+
+def check_reset(backend):
+    backend.insert_analytics_batch([event(n) for n in range(80, 83)])
+    backend.insert_registration(registration(14))
+    deleted = backend.reset_analytics()
+    assert deleted['analytics'] >= 3 and deleted['registrations'] >= 1
+    stats = backend.get_analytics_stats()
+    assert (stats['total_events'], stats['total_registrations']) == (0, 0)
+    assert backend.get_analytics_summary(sections=['overview'])['overview']['page_views'] == 0
+    assert backend.reset_analytics() == {'analytics': 0, 'registrations': 0}
+
+
+EXCLUSIVE_CHECKS = (check_outbox, check_ab_test_chunks, check_backup, check_reset)
+
+
+def test_exclusive_checks():
+    directory = tempfile.mkdtemp()
+    backend = SQLiteStorage(os.path.join(directory, 'exclusive.db'), backup_dir=os.path.join(directory, 'backups'))
+    backend.init_db()
+    for check in EXCLUSIVE_CHECKS:
+        check(backend)
+    backend.close()
+    print("   ✅ sqlite: CRM outbox, A/B chunks, backups and reset")
+
+
+def test_throughput():
+    """Same workload on each backend; prints events/s so they can be compared"""
+    for backend in backends():
+        events = [event(n) for n in range(1000, 1000 + BATCH_EVENTS)]
+        started = time.perf_counter()
+        for offset in range(0, BATCH_EVENTS, 200):
+            backend.insert_analytics_batch(events[offset:offset + 200])
+        batch_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for data in events[:200]:
+            backend.insert_analytics(dict(data, eventId=None))
+        single_seconds = time.perf_counter() - started
+
+        # Concurrent single inserts, as request threads send them
+        concurrent = [dict(data, eventId=None) for data in events[:CONCURRENT_WRITERS * 100]]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(CONCURRENT_WRITERS) as pool:
+            ids = list(pool.map(backend.insert_analytics, concurrent))
+        concurrent_seconds = time.perf_counter() - started
+        assert len(set(ids)) == len(concurrent)
+
+        started = time.perf_counter()
+        rows = backend.get_all_analytics(event_type=f'conformance_{MARKER}')
+        read_seconds = time.perf_counter() - started
+        assert len(rows) == BATCH_EVENTS + 200 + len(concurrent)
+        cleanup(backend)
+        print(f"   ✅ {backend.name}: {BATCH_EVENTS / batch_seconds:,.0f} events/s batched, "
+              f"{200 / single_seconds:,.0f} events/s single, "
+              f"{len(concurrent) / concurrent_seconds:,.0f} events/s from {CONCURRENT_WRITERS} threads, "
+              f"{len(rows) / read_seconds:,.0f} rows/s read")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing storage backends")
+    print("=" * 60)
+    print(f"Backends: {', '.join(backend.name for backend in backends())}")
+    test_round_trip()
+    test_validation_and_duplicates()
+    test_batch_is_idempotent()
+    test_filters_and_projection()
+    test_stats_and_deletes()
+    test_referral_stats()
+    test_settings()
+    test_pages_and_streams()
+    test_summary()
+    test_versions_and_page_config()
+    test_exclusive_checks()
+    test_throughput()
+    print("\n✅ All storage tests passed!")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test the bounded TTL cache used for geolocation lookups
+Run: python3 test_ttl_cache.py
+"""
+
+import threading
+import time
+
+from ttl_cache import TTLCache
+
+
+def test_hit_after_load():
+    """A loaded value is served from cache until it expires"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'country': 'NZ'}
+
+    assert cache.get_or_load('1.1.1.1', loader) == {'country': 'NZ'}
+    assert cache.get_or_load('1.1.1.1', loader) == {'country': 'NZ'}
+    assert len(calls) == 1
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    print("   ✅ Cached value reused")
+
+
+def test_ttl_expiry():
+    """Expired entries are reloaded"""
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    values = iter(['first', 'second'])
+    assert cache.get_or_load('ip', lambda: next(values)) == 'first'
+    time.sleep(0.1)
+    assert cache.get_or_load('ip', lambda: next(values)) == 'second'
+    assert cache.stats()['expirations'] == 1
+    print("   ✅ Entries expire after ttl")
+
+
+def test_lru_eviction():
+    """The least recently used key is evicted at maxsize"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # a is now most recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+    assert cache.stats()['evictions'] == 1
+    print("   ✅ Least recently used entry evicted")
+
+
+def test_negative_caching():
+    """A failed load is remembered and re-raised without calling upstream"""
+    cache = TTLCache(maxsize=10, ttl=60, negative_ttl=0.1)
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise ValueError('Rate limited')
+
+    for _ in range(3):
+        try:
+            cache.get_or_load('ip', failing)
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert str(e) == 'Rate limited'
+    assert len(calls) == 1
+    assert cache.stats()['negative_hits'] == 2
+
+    time.sleep(0.15)
+    assert cache.get_or_load('ip', lambda: 'ok') == 'ok'
+    print("   ✅ Errors cached for negative_ttl")
+
+
+def test_concurrent_misses_are_coalesced():
+    """Many threads missing on one key trigger exactly one upstream call"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(2)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('ip', slow_loader)))
+               for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ['value'] * 20
+    assert cache.stats()['coalesced'] == 19
+    print("   ✅ Concurrent misses coalesced into one load")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing TTL Cache")
+    print("=" * 60)
+    test_hit_after_load()
+    test_ttl_expiry()
+    test_lru_eviction()
+    test_negative_caching()
+    test_concurrent_misses_are_coalesced()
+    print("\n✅ All TTL cache tests passed!")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test the write-behind buffer without a database server
+Run: python3 test_write_behind.py
+"""
+
+import threading
+import time
+
+from write_behind import WriteBehindBuffer, BufferFullError
+
+
+def test_batches_by_size():
+    """A full batch should be flushed in one call"""
+    batches = []
+    buffer = WriteBehindBuffer('test', batches.append, batch_size=10, flush_interval=5)
+    for i in range(10):
+        buffer.submit(i)
+
+    deadline = time.monotonic() + 2
+    while not batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    buffer.close()
+
+    assert batches[0] == list(range(10))
+    print("   ✅ Full batch flushed immediately")
+
+
+def test_batches_by_time():
+    """A partial batch should be flushed once flush_interval passes"""
+    batches = []
+    buffer = WriteBehindBuffer('test', batches.append, batch_size=100, flush_interval=0.05)
+    buffer.submit('a')
+    buffer.submit('b')
+    time.sleep(0.3)
+
+    assert batches == [['a', 'b']]
+    buffer.close()
+    print("   ✅ Partial batch flushed after interval")
+
+
+def test_close_drains_queue():
+    """Everything submitted before close() must be written"""
+    written = []
+    slow = threading.Event()
+
+    def flush(batch):
+        slow.wait(0.01)
+        written.extend(batch)
+
+    buffer = WriteBehindBuffer('test', flush, batch_size=7, flush_interval=10)
+    for i in range(100):
+        buffer.submit(i)
+    buffer.close()
+
+    assert sorted(written) == list(range(100))
+    assert buffer.stats()['flushed'] == 100
+    assert buffer.depth() == 0
+    print("   ✅ Queue drained on shutdown")
+
+
+def test_full_queue_rejects():
+    """Submitting past max_queue should raise so the caller can write directly"""
+    gate = threading.Event()
+    buffer = WriteBehindBuffer('test', lambda batch: gate.wait(), max_queue=2,
+                               batch_size=1, flush_interval=0)
+    buffer.submit(1)
+    time.sleep(0.05)  # flusher picks up item 1 and blocks
+    buffer.submit(2)
+    buffer.submit(3)
+
+    try:
+        buffer.submit(4)
+        assert False, "expected BufferFullError"
+    except BufferFullError:
+        pass
+
+    assert buffer.stats()['rejected'] == 1
+    gate.set()
+    buffer.close()
+    print("   ✅ Full buffer rejects new items")
+
+
+def test_bad_item_is_isolated():
+    """A failing batch should be retried row by row so good rows survive"""
+    written = []
+
+    def flush(batch):
+        if 'bad' in batch:
+            raise ValueError('bad row')
+        written.extend(batch)
+
+    buffer = WriteBehindBuffer('test', flush, batch_size=10, flush_interval=0.05, retries=1)
+    for item in ['a', 'bad', 'b']:
+        buffer.submit(item)
+    buffer.close()
+
+    assert written == ['a', 'b']
+    assert buffer.stats()['failed'] == 1
+    print("   ✅ Bad row isolated from its batch")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing Write-Behind Buffer")
+    print("=" * 60)
+    test_batches_by_size()
+    test_batches_by_time()
+    test_close_drains_queue()
+    test_full_queue_rejects()
+    test_bad_item_is_isolated()
+    print("\n✅ All write-behind tests passed!")
@@ -0,0 +1,161 @@
+"""
+Bounded TTL Cache
+Thread-safe LRU cache with per-entry expiry, negative caching and request
+coalescing, for memoizing slow upstream lookups (e.g. IP geolocation).
+
+get_or_load(key, loader) returns a fresh cached value or calls loader() to
+produce one. If several threads miss on the same key at once, only the first
+calls loader(); the rest wait for its result. When loader() raises, the
+exception is cached for `negative_ttl` seconds and re-raised to every caller
+in that window, so a failing upstream isn't hammered.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Pending:
+    """An in-flight load that other callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """LRU + TTL cache
+
+    Args:
+        maxsize: maximum number of entries (least recently used are evicted)
+        ttl: seconds a successful value stays fresh
+        negative_ttl: seconds a failed load is remembered (0 = don't cache errors)
+        load_timeout: seconds a coalesced caller waits for another thread's load
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600.0, negative_ttl=60.0, load_timeout=10.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.load_timeout = load_timeout
+
+        self._entries = OrderedDict()  # key -> (expires_at, value, error)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'loads': 0,
+            'load_errors': 0,
+            'evictions': 0,
+            'expirations': 0,
+        }
+
+    def get(self, key, default=None):
+        """Return a fresh cached value without loading (errors count as missing)"""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None or entry[2] is not None:
+                return default
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store a value directly"""
+        with self._lock:
+            self._store(key, value, None, self.ttl if ttl is None else ttl)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() at most once per miss"""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                _, value, error = entry
+                if error is not None:
+                    self._stats['negative_hits'] += 1
+                    raise error
+                self._stats['hits'] += 1
+                return value
+
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                self._stats['misses'] += 1
+                pending = self._pending[key] = _Pending()
+            else:
+                self._stats['coalesced'] += 1
+        if not owner:
+            return self._wait(pending)
+
+        try:
+            pending.value = loader()
+        except Exception as e:
+            pending.error = e
+        finally:
+            with self._lock:
+                self._stats['loads'] += 1
+                if pending.error is not None:
+                    self._stats['load_errors'] += 1
+                    if self.negative_ttl > 0:
+                        self._store(key, None, pending.error, self.negative_ttl)
+                else:
+                    self._store(key, pending.value, None, self.ttl)
+                self._pending.pop(key, None)
+            pending.done.set()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.value
+
+    def invalidate(self, key):
+        """Drop one key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry (stats are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Snapshot of cache counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['size'] = len(self._entries)
+        lookups = snapshot['hits'] + snapshot['negative_hits'] + snapshot['misses'] + snapshot['coalesced']
+        snapshot['maxsize'] = self.maxsize
+        snapshot['hit_ratio'] = round((snapshot['hits'] + snapshot['negative_hits']) / lookups, 4) if lookups else 0.0
+        return snapshot
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _wait(self, pending):
+        if not pending.done.wait(self.load_timeout):
+            raise TimeoutError('timed out waiting for a concurrent load')
+        if pending.error is not None:
+            raise pending.error
+        return pending.value
+
+    def _lookup(self, key):
+        """Fresh entry for key (marked most recently used) or None; caller holds the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            self._stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, value, error, ttl):
+        """Insert an entry and evict down to maxsize; caller holds the lock"""
+        self._entries[key] = (time.monotonic() + ttl, value, error)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
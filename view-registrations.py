@@ -4,11 +4,12 @@ View Registration Backups
 Simple script to view registration backup files
 """
 
-import json
 import os
 from datetime import datetime
 from glob import glob
 
+from jsonl_log import read_records
+
 def view_registrations():
     backup_dir = 'backups'
     
@@ -16,8 +17,11 @@ def view_registrations():
         print("❌ No backups directory found. No registrations backed up yet.")
         return
     
-    # Find all registration backup files
-    backup_files = sorted(glob(os.path.join(backup_dir, 'registrations-*.json')))
+    # Find all registration backup files (.jsonl logs and older .json arrays)
+    backup_files = sorted(
+        glob(os.path.join(backup_dir, 'registrations-*.jsonl'))
+        + glob(os.path.join(backup_dir, 'registrations-*.json'))
+    )
     
     if not backup_files:
         print("❌ No registration backup files found.")
@@ -31,19 +35,16 @@ def view_registrations():
     
     for backup_file in backup_files:
         try:
-            with open(backup_file, 'r') as f:
-                registrations = json.load(f)
-            
-            if not registrations:
-                continue
-            
             filename = os.path.basename(backup_file)
-            date = filename.replace('registrations-', '').replace('.json', '')
+            date = filename.replace('registrations-', '').replace('.jsonl', '').replace('.json', '')
             
-            print(f"\n📅 {date} - {len(registrations)} registrations")
+            print(f"\n📅 {date}")
             print("-" * 80)
             
-            for idx, reg in enumerate(registrations, 1):
+            # Records are streamed, so even a huge day's log is never loaded at once
+            count = 0
+            for idx, reg in enumerate(read_records(backup_file), 1):
+                count = idx
                 total_registrations += 1
                 name = f"{reg.get('firstName', '')} {reg.get('lastName', '')}".strip()
                 email = reg.get('email', 'N/A')
@@ -54,6 +55,8 @@ def view_registrations():
                 location = f"{city}, {country}" if city else country
                 
                 print(f"{idx:3}. {name:25} | {email:30} | {location:25} | {timestamp}")
+            
+            print(f"   {count} registrations")
         
         except Exception as e:
             print(f"❌ Error reading {backup_file}: {e}")
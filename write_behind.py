@@ -0,0 +1,152 @@
+"""
+Write-Behind Buffer
+Accepts rows into a bounded in-memory queue and returns immediately; a
+background thread writes them to the database in multi-row batches.
+
+A batch is flushed when it reaches `batch_size` rows or when `flush_interval`
+seconds have passed since its first row, whichever comes first. close() (also
+registered with atexit) drains everything still queued before the process exits.
+"""
+
+import atexit
+import queue
+import threading
+import time
+
+
+class BufferFullError(Exception):
+    """Raised when the queue is at capacity and the caller must write directly"""
+
+
+class WriteBehindBuffer:
+    """Bounded queue + background flusher
+
+    Args:
+        name: label used in log lines and stats
+        flush: callable taking a list of items and writing them in one batch
+        max_queue: maximum number of items waiting to be written
+        batch_size: maximum items per flush() call
+        flush_interval: maximum seconds an item waits before being flushed
+        retries: attempts per batch before falling back to one-by-one writes
+    """
+
+    def __init__(self, name, flush, max_queue=10000, batch_size=500,
+                 flush_interval=1.0, retries=3):
+        self.name = name
+        self._flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'rejected': 0,
+            'flushed': 0,
+            'batches': 0,
+            'failed': 0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name=f'{name}-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, item):
+        """Queue an item for writing; raises BufferFullError when at capacity"""
+        if self._stop.is_set():
+            raise BufferFullError(f"{self.name} buffer is closed")
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise BufferFullError(f"{self.name} buffer is full ({self._queue.maxsize} items)")
+        with self._lock:
+            self._stats['enqueued'] += 1
+
+    def depth(self):
+        """Number of items waiting to be written"""
+        return self._queue.qsize()
+
+    def stats(self):
+        """Snapshot of buffer counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot['depth'] = self.depth()
+        snapshot['capacity'] = self._queue.maxsize
+        return snapshot
+
+    def close(self, timeout=10.0):
+        """Stop accepting items and drain the queue"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _next_batch(self):
+        """Block for the first item, then collect until size or time threshold"""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        """Pull everything left in the queue without waiting"""
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """Write a batch, retrying, then isolating bad rows one at a time"""
+        for attempt in range(self.retries):
+            try:
+                self._flush(batch)
+                with self._lock:
+                    self._stats['flushed'] += len(batch)
+                    self._stats['batches'] += 1
+                return
+            except Exception as e:
+                print(f'⚠️ {self.name} batch of {len(batch)} failed (attempt {attempt + 1}): {e}')
+                if attempt + 1 < self.retries:
+                    time.sleep(0.2 * (2 ** attempt))
+
+        for item in batch:
+            try:
+                self._flush([item])
+                with self._lock:
+                    self._stats['flushed'] += 1
+            except Exception as e:
+                with self._lock:
+                    self._stats['failed'] += 1
+                print(f'❌ {self.name} dropped item after retries: {e}')
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+        # Shutdown: flush whatever is still queued
+        while True:
+            batch = self._drain()
+            if not batch:
+                break
+            self._write(batch)